@@ -1,5 +1,5 @@
 from __future__ import annotations  # Required for forward references
-from collections.abc import Callable
+from collections import OrderedDict
 from pathlib import Path
 import sys
 from typing import (
@@ -12,13 +12,17 @@ import pygame as pg
 from pygame import (
     font,
     mixer,
-    time,
     display,
+    Rect,
     Surface,
     sprite,
 )
 
-from .parser import Parser, Level_FILE
+from .parser import Parser, Level_FILE, LevelWatcher
+from .Conf import Conf
+from .audio import SongStream, AudioCache
+from .pacer import FramePacer
+from .profiler import Profiler
 from .lib import Lib
 
 
@@ -28,11 +32,7 @@ class App:
     """
 
     LEVELS: dict[list[str], Level_FILE]
-    CLOCK: time.Clock
-    DELTA_TIME: Callable[[], int]
-    DELTA_TIME = time.get_ticks
-    # it's really stupid to have one callable among other constants but oh well
-    # it's the cleanest way that remains type safe
+    PACER: FramePacer
     SCREEN: Surface
     STATE: str
     """
@@ -57,8 +57,13 @@ class App:
 
         pg.init()
         App.LEVELS = Parser.level_load()
-        App.CLOCK = time.Clock()
-        App.SCREEN = display.set_mode(size=(Conf.SCREEN_SIZE[0], Conf.SCREEN_SIZE[1]), vsync=1)
+        if Conf.WATCH_LEVELS:
+            LevelWatcher.start(Conf.WATCH_INTERVAL)
+        App.PACER = FramePacer()
+        App.SCREEN = display.set_mode(
+            size=(Conf.SCREEN_SIZE[0], Conf.SCREEN_SIZE[1]),
+            vsync=int(App.PACER.mode != "uncapped"),
+        )
         display.set_caption("7k rg 1.0.0")
         App.STATE = "Menu"
         App.AUTO = False
@@ -94,7 +99,10 @@ class App:
                     elif out is True:
                         App.STATE = "Menu"
                 case "Game":
+                    LevelWatcher.pause()
                     out = Game.ingame_loop(App.CURRENT_LEVEL)
+                    LevelWatcher.resume()
+                    Profiler.dump()
                     if out is False:
                         App.STATE = "Results"
                     elif out is True:
@@ -107,7 +115,7 @@ class App:
                         App.STATE = "Game"
 
             display.flip()
-            App.CLOCK.tick_busy_loop(120)
+            App.PACER.tick(120)
 
         for event in pg.event.get():
             if event.type == pg.QUIT:
@@ -121,6 +129,8 @@ class App:
         if errors are passed then exit with the first error passed
         """
 
+        LevelWatcher.stop()
+        Profiler.dump()
         if len(args) == 0:
             pg.quit()
             sys.exit(0)
@@ -129,6 +139,62 @@ class App:
             sys.exit(args[0])
 
 
+class TextCache:
+    """
+    Rendered text surfaces shared by every state
+
+    Surfaces are keyed by (font, text, colour, antialias) and the least recently used ones are dropped
+    past Conf.TEXT_CACHE_SIZE, so text that doesn't change between frames is only rendered once
+    Numbers that change all the time are drawn from per-digit glyphs instead of being rendered whole
+    """
+
+    SURFACES: OrderedDict[tuple, Surface] = OrderedDict()
+    HITS = 0
+    MISSES = 0
+
+    @staticmethod
+    def render(
+        fnt: font.Font, text: str, antialias: bool, color: tuple[int, int, int]
+    ) -> Surface:
+        """
+        Same arguments as Font.render
+        """
+
+        key = (fnt, text, color, antialias)
+        surface = TextCache.SURFACES.get(key)
+        if surface is not None:
+            TextCache.SURFACES.move_to_end(key)
+            TextCache.HITS += 1
+            return surface
+        TextCache.MISSES += 1
+        surface = fnt.render(text, antialias, color)
+        TextCache.SURFACES[key] = surface
+        if len(TextCache.SURFACES) > Conf.TEXT_CACHE_SIZE:
+            TextCache.SURFACES.popitem(last=False)
+        return surface
+
+    @staticmethod
+    def draw_number(
+        surface: Surface,
+        fnt: font.Font,
+        value: int,
+        color: tuple[int, int, int],
+        topright: tuple[int, int],
+    ) -> Rect:
+        """
+        Blits value right aligned at topright from cached digit glyphs
+        """
+
+        glyphs = [TextCache.render(fnt, digit, True, color) for digit in str(value)]
+        x, y = topright
+        blits = list()
+        for glyph in reversed(glyphs):
+            x -= glyph.get_width()
+            blits.append((glyph, (x, y)))
+        surface.blits(blits, doreturn=False)
+        return Rect(x, y, topright[0] - x, fnt.get_height())
+
+
 class AudioWrapper:
     """
     Implementation for a 16 channel audio system
@@ -147,7 +213,8 @@ class AudioWrapper:
     lane4: mixer.Channel
     lane5: mixer.Channel
     lane6: mixer.Channel
-    song: mixer.Channel
+    song: mixer.Channel | SongStream
+    # streams from disk unless Conf.STREAM_SONGS is off
     extra0: mixer.Channel
     extra1: mixer.Channel
     extra2: mixer.Channel
@@ -170,7 +237,7 @@ class AudioWrapper:
         AudioWrapper.lane5 = mixer.Channel(8)
         AudioWrapper.lane6 = mixer.Channel(9)
 
-        AudioWrapper.song = mixer.Channel(10)
+        AudioWrapper.song = SongStream() if Conf.STREAM_SONGS else mixer.Channel(10)
 
         AudioWrapper.extra0 = mixer.Channel(11)
         AudioWrapper.extra1 = mixer.Channel(12)
@@ -184,7 +251,17 @@ class AudioWrapper:
                 AudioWrapper.AUDIO_FILES[file.name] = mixer.Sound(file)
 
     @staticmethod
-    def play(sound: mixer.Sound, channel: mixer.Channel) -> None:
+    def load(path: Path) -> mixer.Sound:
+        """
+        Decodes a sound through AudioCache, so sounds used again don't get decoded twice
+        """
+
+        return AudioCache.get(path)
+
+    @staticmethod
+    def play(
+        sound: mixer.Sound | Path, channel: mixer.Channel | SongStream
+    ) -> None:
         channel.play(sound)
 
     @staticmethod
@@ -30,9 +30,76 @@ class Conf:
     # change file formats as necessary
     # however default textures are shipped with the game
 
+    # Parsed levels are cached here so unchanged charts skip the parser
+    LEVEL_CACHE = Path(Lib.PROJECT_ROOT, "STO", "levels.bin")
+    # Poll the level folder in the background for newly added levels
+    WATCH_LEVELS = False
+    WATCH_INTERVAL = 1.0
+    # Level files are parsed across this many processes, 0 uses every core
+    SCAN_WORKERS = 0
+    # Fewer changed files than this are parsed serially
+    SCAN_PARALLEL_MIN = 64
+
+    # One key per lane, named as pygame.key.name reports them
+    KEYS = ("s", "d", "f", "space", "j", "k", "l")
+
+    # Stream songs from disk through mixer.music instead of decoding them into a Sound
+    STREAM_SONGS = True
+    # Decoded songs are kept in memory up to this many bytes
+    AUDIO_CACHE_BYTES = 256 * 1024 * 1024
+    # Also keep decoded songs on disk, roughly 10MB per minute of audio
+    AUDIO_PERSIST = False
+    AUDIO_PCM_DIR = Path(Lib.PROJECT_ROOT, "STO", "pcm")
+    # Level select waits this long after the selection settles before loading a preview
+    PREVIEW_DEBOUNCE = 250
+    PREVIEW_FADE = 500
+
+    # Level select thumbnails, stored on disk and the most recent ones kept in memory
+    THUMB_DIR = Path(Lib.PROJECT_ROOT, "STO", "thumbs")
+    THUMB_CACHE_SIZE = 64
+
+    # "vsync" paces frames to the display's refresh rate, "capped" to the fps each screen asks for,
+    # "uncapped" doesn't wait at all and also turns the window's vsync off
+    FRAME_MODE = "capped"
+    # The last this many ms of each frame are spun out instead of slept for accuracy
+    FRAME_SPIN = 1.0
+    # Frame times kept for the percentiles
+    FRAME_SAMPLES = 512
+
+    # Time every phase of the game loop from the start, F3 toggles it ingame
+    PROFILE = False
+    # Laps kept per phase for the overlay's percentiles
+    PROFILE_SAMPLES = 1024
+    # Laps kept for the trace written to TRACE_DIR when the level or game ends
+    PROFILE_TRACE_EVENTS = 500_000
+    TRACE_DIR = Path(Lib.PROJECT_ROOT, "STO", "traces")
+
+    # Record the key events of every finished play so its score can be checked later
+    RECORD_REPLAYS = True
+    REPLAY_DIR = Path(Lib.PROJECT_ROOT, "STO", "replays")
+
+    # Benchmark results and the baseline they're compared against
+    BENCH_DIR = Path(Lib.PROJECT_ROOT, "STO", "bench")
+
+    # Most rendered text surfaces kept around at once
+    TEXT_CACHE_SIZE = 256
+
+    # The song clock is compared against the audio position every this many ms
+    CLOCK_SYNC_INTERVAL = 50
+    # and moved this fraction of the way towards it
+    CLOCK_SMOOTHING = 0.1
+    # unless they're further apart than this many ms, then it jumps straight there
+    CLOCK_RESYNC = 200
+
     # These two handle scroll velocity
     CONSTANT = 950
     MULTIPLIER = 2.5
+    # Judgement steps per second, independent of the frame rate
+    SIM_RATE = 1000
+    # Extra ms notes are kept around beyond the edges of the screen
+    SPAWN_MARGIN = 50
+    # Most long note body strips kept scaled at once
+    BODY_CACHE_SIZE = 8
 
     HIT_WINDOWS = {
         "plusperfect": 30,
@@ -42,6 +109,14 @@ class Conf:
         "miss": 200,
     }
 
+    HEALTH = {
+        "plusperfect": 5,
+        "perfect": 3,
+        "great": 1,
+        "good": 0,
+        "miss": -80,
+    }
+
     SCORING = {
         "plusperfect": 301,
         "perfect": 300,
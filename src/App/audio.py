@@ -0,0 +1,227 @@
+from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import blake2b
+from pathlib import Path
+from threading import Lock
+
+from pygame import mixer
+
+from .Conf import Conf
+
+
+class SongStream:
+    """
+    Channel-like wrapper around mixer.music so songs stream from disk instead of being decoded up front
+
+    Exposes the same calls AudioWrapper uses on a mixer.Channel, plus a playback position and seeking
+    Only one stream can play at a time, starting a new one replaces the old one
+    """
+
+    __slots__ = ("source", "start")
+
+    def __init__(self) -> None:
+        self.source: Path | None = None
+        self.start = 0.0
+        # song position in ms the current play() started from
+
+    def play(self, source: Path, start: float = 0, fade_ms: int = 0) -> None:
+        if source != self.source:
+            mixer.music.load(str(source))
+            self.source = source
+        mixer.music.play(start=start / 1000, fade_ms=fade_ms)
+        self.start = start
+
+    def seek(self, position: float) -> None:
+        """
+        Restarts playback at position ms, restarting keeps get_pos in step with the new position
+        """
+
+        paused = not self.get_busy()
+        mixer.music.play(start=position / 1000)
+        self.start = position
+        if paused:
+            mixer.music.pause()
+
+    def position(self) -> float:
+        """
+        Current song position in ms, -1 when nothing is playing
+        """
+
+        played = mixer.music.get_pos()
+        if played == -1:
+            return -1
+        return self.start + played
+
+    def pause(self) -> None:
+        mixer.music.pause()
+
+    def unpause(self) -> None:
+        mixer.music.unpause()
+
+    def stop(self) -> None:
+        mixer.music.stop()
+
+    def fadeout(self, fadeout_time: int) -> None:
+        mixer.music.fadeout(fadeout_time)
+
+    def set_volume(self, volume: float) -> None:
+        mixer.music.set_volume(volume)
+
+    def get_busy(self) -> bool:
+        return mixer.music.get_busy()
+
+
+class AudioCache:
+    """
+    Fully decoded songs kept in memory so replays, retries and previews skip the decoder
+
+    Sounds are evicted least recently used first once they use more than Conf.AUDIO_CACHE_BYTES
+    With Conf.AUDIO_PERSIST the raw PCM is also written to STO and read back on later runs
+    HITS, DISK_HITS and MISSES are there to help size the budget
+    """
+
+    SOUNDS: OrderedDict[tuple[str, int, int], tuple[mixer.Sound, int]] = OrderedDict()
+    # (path, size, mtime) -> (sound, decoded bytes), least recently used first
+    SIZE = 0
+    HITS = 0
+    DISK_HITS = 0
+    MISSES = 0
+    LOCK = Lock()
+    # previews are decoded on a worker thread
+
+    @staticmethod
+    def sound_bytes(sound: mixer.Sound) -> int:
+        freq, size, channels = mixer.get_init()
+        return round(sound.get_length() * freq) * channels * (abs(size) // 8)
+
+    @staticmethod
+    def pcm_path(key: tuple[str, int, int]) -> Path:
+        """
+        Raw PCM only makes sense for the mixer format it was decoded to, so that's part of the name
+        """
+
+        freq, size, channels = mixer.get_init()
+        name = blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return Path(Conf.AUDIO_PCM_DIR, f"{name}-{freq}-{size}-{channels}.pcm")
+
+    @staticmethod
+    def get(path: Path) -> mixer.Sound:
+        with AudioCache.LOCK:
+            return AudioCache.fetch(path)
+
+    @staticmethod
+    def fetch(path: Path) -> mixer.Sound:
+        stat = path.stat()
+        key = (str(path), stat.st_size, stat.st_mtime_ns)
+        entry = AudioCache.SOUNDS.get(key)
+        if entry is not None:
+            AudioCache.SOUNDS.move_to_end(key)
+            AudioCache.HITS += 1
+            return entry[0]
+
+        sound = None
+        pcm = AudioCache.pcm_path(key) if Conf.AUDIO_PERSIST else None
+        if pcm is not None and pcm.exists():
+            sound = mixer.Sound(buffer=pcm.read_bytes())
+            AudioCache.DISK_HITS += 1
+        if sound is None:
+            sound = mixer.Sound(str(path))
+            AudioCache.MISSES += 1
+            if pcm is not None:
+                pcm.parent.mkdir(parents=True, exist_ok=True)
+                pcm.write_bytes(sound.get_raw())
+
+        size = AudioCache.sound_bytes(sound)
+        if size <= Conf.AUDIO_CACHE_BYTES:
+            AudioCache.SOUNDS[key] = (sound, size)
+            AudioCache.SIZE += size
+            while AudioCache.SIZE > Conf.AUDIO_CACHE_BYTES:
+                _, (_, evicted) = AudioCache.SOUNDS.popitem(last=False)
+                AudioCache.SIZE -= evicted
+        return sound
+
+    @staticmethod
+    def clear() -> None:
+        AudioCache.SOUNDS.clear()
+        AudioCache.SIZE = 0
+
+
+class PreviewLoader:
+    """
+    Plays song previews from a level's PreviewTime without blocking the level select loop
+
+    Requests are debounced so scrolling quickly through the list doesn't start a load per row,
+    then prepared on a worker thread (decoding only happens when songs aren't streamed)
+    Every request or cancel bumps the generation, so superseded jobs are dropped instead of played
+    Playback itself is started from update() on the main thread
+    """
+
+    __slots__ = ("channel", "executor", "lock", "generation", "pending", "ready")
+
+    def __init__(self, channel: mixer.Channel | SongStream) -> None:
+        self.channel = channel
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.lock = Lock()
+        self.generation = 0
+        self.pending: tuple[int, Path, int, int] | None = None
+        # (generation, path, start ms, due tick) waiting out the debounce
+        self.ready: tuple[int, Path | mixer.Sound, int] | None = None
+        # (generation, source, start ms) prepared by the worker
+
+    def request(self, path: Path, start: int, now: int) -> None:
+        self.cancel()
+        due = now + Conf.PREVIEW_DEBOUNCE
+        self.pending = (self.generation, path, max(start, 0), due)
+
+    def cancel(self) -> None:
+        self.generation += 1
+        self.pending = None
+        if self.channel.get_busy():
+            self.channel.fadeout(Conf.PREVIEW_FADE)
+
+    def update(self, now: int) -> None:
+        if self.pending is not None and now >= self.pending[3]:
+            generation, path, start, _ = self.pending
+            self.pending = None
+            self.executor.submit(self.prepare, generation, path, start)
+
+        with self.lock:
+            ready = self.ready
+            self.ready = None
+        if ready is None or ready[0] != self.generation:
+            return
+        _, source, start = ready
+        if isinstance(self.channel, SongStream):
+            self.channel.play(source, start, fade_ms=Conf.PREVIEW_FADE)
+        else:
+            self.channel.play(source, fade_ms=Conf.PREVIEW_FADE)
+
+    def prepare(self, generation: int, path: Path, start: int) -> None:
+        if generation != self.generation or not path.exists():
+            return
+        if isinstance(self.channel, SongStream):
+            source = path
+        else:
+            source = PreviewLoader.trim(AudioCache.get(path), start)
+        with self.lock:
+            if generation == self.generation:
+                self.ready = (generation, source, start)
+
+    @staticmethod
+    def trim(sound: mixer.Sound, start: int) -> mixer.Sound:
+        """
+        Decoded sounds can't start part way through, so the preview is a copy from start onwards
+        """
+
+        freq, size, channels = mixer.get_init()
+        frame = channels * (abs(size) // 8)
+        offset = int(start / 1000 * freq) * frame
+        raw = sound.get_raw()
+        if offset <= 0 or offset >= len(raw):
+            return sound
+        return mixer.Sound(buffer=raw[offset:])
+
+    def shutdown(self) -> None:
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
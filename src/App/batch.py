@@ -0,0 +1,268 @@
+from __future__ import annotations
+from collections.abc import Sequence
+from heapq import merge
+from math import ceil, floor, inf
+
+from .Conf import Conf
+from .judge import Judge
+from .notes import NoteTable
+
+
+class BatchResult:
+    """
+    Everything a batch run judged
+
+    awards holds (time, note, judgement, offset) in the order the interactive judge would have awarded them,
+    offset is the key event's time minus the note's (head or tail), None for misses and autoplay
+    health_curve holds the health after each award
+    """
+
+    __slots__ = ("score", "health", "counts", "awards", "health_curve")
+
+    def __init__(self) -> None:
+        self.score = 0
+        self.health = Judge.MAX_HEALTH
+        self.counts = dict.fromkeys(Conf.HIT_WINDOWS, 0)
+        self.awards: list[tuple[float, int, str, float | None]] = list()
+        self.health_curve: list[int] = list()
+
+
+class BatchJudge:
+    """
+    Judges a whole play in one pass instead of stepping a Judge through it
+
+    Gives exactly what Simulation + Judge give for the same events and end step: every lane is
+    walked once over its own notes and key events, and the only thing lanes share, the points where
+    the judge sweeps for misses (every step end and every key press), is looked up instead of stepped
+    through, so the cost follows the number of notes and events rather than the length of the song
+    Each lane's awards come out keyed by where in the step-by-step run they would have happened
+    and a heap merge puts them back in that order for the health curve (health is capped, so order matters)
+    """
+
+    __slots__ = ("notes", "events", "auto", "step", "first", "end", "steps", "presses", "lanes")
+
+    def __init__(
+        self,
+        notes: NoteTable,
+        events: Sequence[tuple[float, int, bool]] = (),
+        auto: bool = False,
+        end: int | None = None,
+        rate: int = Conf.SIM_RATE,
+        start: float = 0,
+    ) -> None:
+        """
+        end is the last simulation step to judge up to, None judges until nothing is left
+        """
+
+        self.notes = notes
+        self.events = events
+        self.auto = auto
+        self.step = 1000 / rate
+        self.first = int(start // self.step) + 1
+        # first step the simulation runs
+        self.end = inf if end is None else end
+
+        # Simulation applies queued events first in, first out, each in the first step whose end reaches it
+        self.steps: list[int] = list()
+        self.presses: dict[int, list[tuple[int, float]]] = dict()
+        # step -> (event index, time) of every press applied in it, in order
+        self.lanes: list[list[int]] = [list() for _ in range(NoteTable.LANES)]
+        # event indices per lane, so each lane only walks its own events
+        last = self.first
+        for j, (time, lane, down) in enumerate(events if not auto else ()):
+            last = max(last, self.step_reaching(time))
+            if last > self.end:
+                break
+            self.steps.append(last)
+            self.lanes[lane].append(j)
+            if down:
+                self.presses.setdefault(last, list()).append((j, time))
+
+    def step_reaching(self, time: float) -> int:
+        """First step whose end is at or after time"""
+        step = self.step
+        k = max(self.first, ceil(time / step))
+        while k > self.first and time <= (k - 1) * step:
+            k -= 1
+        while time > k * step:
+            k += 1
+        return k
+
+    def step_missing(self, time: float) -> int:
+        """First step whose closing sweep counts a note at time as missed"""
+        step = self.step
+        window = Conf.HIT_WINDOWS["miss"]
+        k = max(self.first, floor((time + window) / step) + 1)
+        while k > self.first and time < (k - 1) * step - window:
+            k -= 1
+        while not time < k * step - window:
+            k += 1
+        return k
+
+    def miss_point(self, time: float, k0: int, j0: float, inclusive: bool) -> tuple[int, float]:
+        """
+        The first sweep from (k0, j0) on that counts a note at time as missed, as (step, event index)
+        A step's closing sweep has index inf, so it sorts after the presses in that step
+        """
+
+        window = Conf.HIT_WINDOWS["miss"]
+        k = self.step_missing(time)
+        jmin: float = 0
+        if k <= k0:
+            k = k0
+            jmin = j0 if inclusive else j0 + 1
+        for j, press in self.presses.get(k, ()):
+            if j >= jmin and time < press - window:
+                return (k, j)
+        return (k, inf)
+
+    def lane_sweeps(self, lane: int, queue: list[int]) -> list[tuple]:
+        """
+        Awards for one lane when playing from key events, keyed (step, event index, phase, lane, order, note)
+        Phase 0 is a sweep and 1 a hit or release, so within a press the sweep comes first like in Judge.press
+        """
+
+        notes = self.notes
+        times = notes.time
+        awards: list[tuple] = list()
+        head = 0
+        holding = -1
+        head_point = self.miss_point(times[queue[0]], self.first, 0, True) if queue else None
+        hold_point: tuple[int, float] | None = None
+
+        def flush(limit: tuple[int, float]) -> None:
+            nonlocal head, holding, head_point, hold_point
+            while True:
+                if (
+                    head_point is not None
+                    and head_point <= limit
+                    and (hold_point is None or head_point <= hold_point)
+                ):
+                    k, j = head_point
+                    at = k * self.step if j == inf else self.events[j][0]
+                    awards.append((k, j, 0, lane, 0, head, at, queue[head], "miss", None))
+                    head += 1
+                    head_point = (
+                        self.miss_point(times[queue[head]], k, j, True) if head < len(queue) else None
+                    )
+                elif hold_point is not None and hold_point <= limit:
+                    k, j = hold_point
+                    at = k * self.step if j == inf else self.events[j][0]
+                    awards.append((k, j, 0, lane, 1, holding, at, holding, "miss", None))
+                    holding = -1
+                    hold_point = None
+                else:
+                    return
+
+        for j in self.lanes[lane]:
+            k = self.steps[j]
+            time, _, down = self.events[j]
+            flush((k, j))
+            if down:
+                if head >= len(queue):
+                    continue
+                i = queue[head]
+                offset = time - times[i]
+                judgement = Judge.grade(abs(offset))
+                if judgement is None:
+                    continue
+                awards.append((k, j, 1, lane, 0, i, time, i, judgement, offset))
+                head += 1
+                if notes.kind[i] == NoteTable.LONG:
+                    holding = i
+                    hold_point = self.miss_point(notes.endtime[i], k, j, False)
+                head_point = (
+                    self.miss_point(times[queue[head]], k, j, False) if head < len(queue) else None
+                )
+            elif holding != -1:
+                offset = time - notes.endtime[holding]
+                judgement = Judge.grade(abs(offset)) or "miss"
+                awards.append((k, j, 1, lane, 0, holding, time, holding, judgement, offset))
+                holding = -1
+                hold_point = None
+        flush((self.end, inf))
+        return awards
+
+    def lane_autoplay(self, lane: int, queue: list[int], delay: int = 10) -> list[tuple]:
+        """
+        Awards for one lane under Judge.autoplay, keyed (step, lane, order)
+        """
+
+        notes = self.notes
+        step = self.step
+        awards: list[tuple] = list()
+        order = 0
+
+        def due_step(time: float) -> int:
+            k = self.step_reaching(time + delay)
+            while k > self.first and time <= (k - 1) * step - delay:
+                k -= 1
+            while not time <= k * step - delay:
+                k += 1
+            return k
+
+        holding = -1
+        release = 0
+        for i in queue:
+            k = due_step(notes.time[i])
+            if holding != -1 and release <= k and release <= self.end:
+                awards.append((release, lane, order, release * step, holding, "plusperfect", None))
+                order += 1
+                holding = -1
+            if k > self.end:
+                break
+            awards.append((k, lane, order, k * step, i, "plusperfect", None))
+            order += 1
+            if notes.kind[i] == NoteTable.LONG:
+                # hitting a long note takes over the hold, so one still held is never released, like in Judge
+                release = due_step(notes.endtime[i])
+                if release == k:
+                    awards.append((k, lane, order, k * step, i, "plusperfect", None))
+                    order += 1
+                    holding = -1
+                else:
+                    holding = i
+        if holding != -1 and release <= self.end:
+            awards.append((release, lane, order, release * step, holding, "plusperfect", None))
+        return awards
+
+    def run(self) -> BatchResult:
+        notes = self.notes
+        queues: list[list[int]] = [list() for _ in range(NoteTable.LANES)]
+        for i, lane in enumerate(notes.lane):
+            queues[lane].append(i)
+
+        if self.auto:
+            lanes = [self.lane_autoplay(lane, queue) for lane, queue in enumerate(queues)]
+            width = 3
+        else:
+            lanes = [self.lane_sweeps(lane, queue) for lane, queue in enumerate(queues)]
+            width = 6
+
+        result = BatchResult()
+        score = 0
+        health = Judge.MAX_HEALTH
+        counts = result.counts
+        curve = result.health_curve
+        awards = result.awards
+        for award in merge(*lanes):
+            at, note, judgement, offset = award[width:]
+            score += Conf.SCORING[judgement]
+            health = min(health + Conf.HEALTH[judgement], Judge.MAX_HEALTH)
+            counts[judgement] += 1
+            awards.append((at, note, judgement, offset))
+            curve.append(health)
+        result.score = score
+        result.health = health
+        return result
+
+    @staticmethod
+    def judge(
+        notes: NoteTable,
+        events: Sequence[tuple[float, int, bool]] = (),
+        auto: bool = False,
+        end: int | None = None,
+        rate: int = Conf.SIM_RATE,
+        start: float = 0,
+    ) -> BatchResult:
+        return BatchJudge(notes, events, auto, end, rate, start).run()
@@ -0,0 +1,138 @@
+from __future__ import annotations
+from collections.abc import Callable
+from hashlib import blake2b
+from pathlib import Path
+from pickle import dump, load, HIGHEST_PROTOCOL, UnpicklingError
+from typing import Any
+
+from .Conf import Conf
+
+
+class LevelCache:
+    """
+    Persistent store for parsed level files, saved to STO between runs
+
+    Entries are keyed by the path of the .osu file and hold its size, mtime and content hash
+    A file is only reparsed once its contents actually change
+    """
+
+    VERSION: int = 2
+    # Bump whenever the shape of the parsed data changes so stale caches are thrown away
+    ENTRIES: dict[str, tuple[int, int, bytes, dict[str, Any]]] = dict()
+    LOADED = False
+    DIRTY = False
+    HITS = 0
+    MISSES = 0
+
+    @staticmethod
+    def load() -> None:
+        """
+        Reads the cache file once per run, a missing or outdated cache just starts empty
+        """
+
+        if LevelCache.LOADED:
+            return
+        LevelCache.LOADED = True
+        try:
+            with Conf.LEVEL_CACHE.open("rb") as f:
+                version, entries = load(f)
+        except (OSError, EOFError, UnpicklingError, ValueError, TypeError):
+            return
+        if version == LevelCache.VERSION:
+            LevelCache.ENTRIES = entries
+
+    @staticmethod
+    def save() -> None:
+        if not LevelCache.DIRTY:
+            return
+        Conf.LEVEL_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Conf.LEVEL_CACHE.with_suffix(".tmp")
+        with tmp.open("wb") as f:
+            dump((LevelCache.VERSION, LevelCache.ENTRIES), f, HIGHEST_PROTOCOL)
+        tmp.replace(Conf.LEVEL_CACHE)
+        LevelCache.DIRTY = False
+
+    @staticmethod
+    def digest(raw: bytes) -> bytes:
+        return blake2b(raw, digest_size=16).digest()
+
+    @staticmethod
+    def refresh(
+        path: Path, known: bytes | None, parse: Callable[[Path], dict[str, Any]]
+    ) -> tuple[bytes, dict[str, Any] | None]:
+        """
+        Hashes path and parses it, unless it still hashes to known (then the data is None)
+        Both the read and the hash happen wherever this runs, so misses can be checked in parallel
+        """
+
+        digest = LevelCache.digest(path.read_bytes())
+        if digest == known:
+            return digest, None
+        return digest, parse(path)
+
+    @staticmethod
+    def fetch(path: Path, parse: Callable[[Path], dict[str, Any]]) -> dict[str, Any]:
+        """
+        Returns the parsed data for path, only calling parse on a miss
+        """
+
+        return LevelCache.fetch_all(
+            [path],
+            lambda paths, known: [LevelCache.refresh(p, k, parse) for p, k in zip(paths, known)],
+        )[0]
+
+    @staticmethod
+    def fetch_all(
+        paths: list[Path],
+        refresh_all: Callable[
+            [list[Path], list[bytes | None]], list[tuple[bytes, dict[str, Any] | None]]
+        ],
+    ) -> list[dict[str, Any]]:
+        """
+        Returns the parsed data for every path in order
+
+        Matching size and mtime are trusted outright, otherwise the content hash decides
+        Every other file is handed to refresh_all in one go with the hash it was cached under,
+        which runs LevelCache.refresh on each of them, possibly in parallel
+        """
+
+        out: list[dict[str, Any] | None] = [None] * len(paths)
+        pending: list[tuple[int, Path, int, int]] = list()
+        known: list[bytes | None] = list()
+        for i, path in enumerate(paths):
+            stat = path.stat()
+            entry = LevelCache.ENTRIES.get(str(path))
+            if (
+                entry is not None
+                and entry[0] == stat.st_size
+                and entry[1] == stat.st_mtime_ns
+            ):
+                LevelCache.HITS += 1
+                out[i] = entry[3]
+                continue
+            pending.append((i, path, stat.st_size, stat.st_mtime_ns))
+            known.append(None if entry is None else entry[2])
+
+        if pending:
+            refreshed = refresh_all([item[1] for item in pending], known)
+            for (i, path, size, mtime), (digest, data) in zip(pending, refreshed):
+                if data is None:
+                    # touched but not changed, keep the parsed data under the new stat
+                    LevelCache.HITS += 1
+                    data = LevelCache.ENTRIES[str(path)][3]
+                else:
+                    LevelCache.MISSES += 1
+                out[i] = data
+                LevelCache.ENTRIES[str(path)] = (size, mtime, digest, data)
+            LevelCache.DIRTY = True
+        return out
+
+    @staticmethod
+    def prune(keep: set[str]) -> None:
+        """
+        Drops entries for files that no longer exist in the library
+        """
+
+        for key in LevelCache.ENTRIES.keys() - keep:
+            del LevelCache.ENTRIES[key]
+            LevelCache.DIRTY = True
@@ -0,0 +1,105 @@
+from __future__ import annotations
+from collections.abc import Callable
+from time import perf_counter_ns
+
+from .Conf import Conf
+
+
+class SongClock:
+    """
+    Song time in ms for rendering and judgement
+
+    Time comes from perf_counter_ns so it has sub-millisecond resolution between audio updates,
+    every Conf.CLOCK_SYNC_INTERVAL ms it's compared against the audio position and moved a
+    Conf.CLOCK_SMOOTHING fraction of the way towards it, which keeps it on the mixer without
+    inheriting the steps in its buffer-sized position updates
+    Errors over Conf.CLOCK_RESYNC ms (a late start, a seek) are snapped instead
+    The clock never runs backwards, corrections that would move it back only slow it down
+
+    drift is the smoothed difference between the audio and the clock in ms (positive: audio ahead),
+    max_drift the largest single error seen since start()
+    """
+
+    __slots__ = (
+        "source",
+        "wall",
+        "anchor",
+        "paused",
+        "last",
+        "next_sync",
+        "drift",
+        "max_drift",
+        "syncs",
+    )
+
+    def __init__(
+        self,
+        source: Callable[[], float] | None = None,
+        wall: Callable[[], int] = perf_counter_ns,
+    ) -> None:
+        self.source = source
+        # audio position in ms, negative when it isn't playing. None free runs on the wall clock
+        self.wall = wall
+        self.anchor = 0
+        # wall time in ns of song time 0
+        self.paused: float | None = None
+        # song time the clock was paused at
+        self.last = 0.0
+        self.next_sync = 0.0
+        self.drift = 0.0
+        self.max_drift = 0.0
+        self.syncs = 0
+
+    def start(self, position: float = 0) -> None:
+        self.anchor = self.wall() - int(position * 1_000_000)
+        self.paused = None
+        self.last = position
+        self.next_sync = position
+        self.drift = 0.0
+        self.max_drift = 0.0
+        self.syncs = 0
+
+    def now(self) -> float:
+        if self.paused is not None:
+            return self.paused
+        now = (self.wall() - self.anchor) / 1_000_000
+        if now >= self.next_sync:
+            now = self.sync(now)
+        if now < self.last:
+            return self.last
+        self.last = now
+        return now
+
+    def sync(self, now: float) -> float:
+        """
+        Pulls the clock towards the audio position, returns the corrected time
+        """
+
+        self.next_sync = now + Conf.CLOCK_SYNC_INTERVAL
+        if self.source is None:
+            return now
+        position = self.source()
+        if position < 0:
+            return now
+        error = position - now
+        self.syncs += 1
+        self.max_drift = max(self.max_drift, abs(error))
+        self.drift += (error - self.drift) * Conf.CLOCK_SMOOTHING
+        if abs(error) > Conf.CLOCK_RESYNC:
+            correction = error
+            self.last = position
+            # a real jump, let it go backwards too
+        else:
+            correction = error * Conf.CLOCK_SMOOTHING
+        self.anchor -= int(correction * 1_000_000)
+        return now + correction
+
+    def pause(self) -> None:
+        if self.paused is None:
+            self.paused = self.now()
+
+    def resume(self) -> None:
+        if self.paused is not None:
+            self.anchor = self.wall() - int(self.paused * 1_000_000)
+            self.next_sync = self.paused
+            self.paused = None
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from pygame import display, Rect, Surface
+
+
+class Compositor:
+    """
+    Keeps the static layers of a screen baked into one surface and only pushes the regions that change
+
+    Every frame the dirty regions are restored from the base layer, drawn over by the caller
+    and sent to the display with display.update(regions) instead of a full flip
+    Anything that draws over the whole screen (pause, countdown) calls invalidate() so the next
+    present() pushes the full frame again
+    """
+
+    __slots__ = ("base", "regions", "area", "dirty_area", "full", "frames", "saved")
+
+    def __init__(self, base: Surface, regions: list[Rect]) -> None:
+        self.base = base
+        self.area = base.get_width() * base.get_height()
+        self.set_regions(regions)
+        self.frames = 0
+        self.saved = 0
+        # pixels not pushed to the display since the last reset()
+
+    @staticmethod
+    def bake(size: tuple[int, int], layers: list[tuple[Surface, Rect | tuple[int, int]]]) -> Surface:
+        """Flattens layers into one surface in the display's pixel format"""
+        base = Surface(size)
+        base.blits(layers, doreturn=False)
+        return base.convert()
+
+    def set_regions(self, regions: list[Rect]) -> None:
+        """Swaps the dirty regions, the next present() pushes the full frame"""
+        self.regions = [region.clip(self.base.get_rect()) for region in regions]
+        self.dirty_area = sum(region.w * region.h for region in self.regions)
+        self.full = True
+
+    def invalidate(self) -> None:
+        self.full = True
+
+    def restore(self, surface: Surface) -> None:
+        """Resets the dirty regions to the base layer, or the whole screen after invalidate()"""
+        if self.full:
+            surface.blit(self.base, (0, 0))
+        else:
+            surface.blits([(self.base, region, region) for region in self.regions], doreturn=False)
+
+    def present(self) -> None:
+        if self.full:
+            display.flip()
+            self.full = False
+        else:
+            display.update(self.regions)
+            self.saved += self.area - self.dirty_area
+        self.frames += 1
+
+    def saved_per_frame(self) -> float:
+        """Average pixels per frame that never had to be copied to the display"""
+        return self.saved / self.frames if self.frames else 0.0
+
+    def reset(self) -> None:
+        self.full = True
+        self.frames = 0
+        self.saved = 0
@@ -0,0 +1,184 @@
+from __future__ import annotations
+from bisect import bisect_left
+from collections.abc import Sequence
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+from pygame import Surface
+
+from .clock import SongClock
+from .Conf import Conf
+from .notes import NoteTable
+
+
+class VirtualClock(SongClock):
+    """
+    Song clock that only moves when told to, stands in for SongClock in headless runs
+    """
+
+    __slots__ = ("time",)
+
+    def __init__(self, time: float = 0.0) -> None:
+        super().__init__()
+        self.time = time
+
+    def now(self) -> float:
+        return self.time
+
+    def advance(self, ms: float) -> None:
+        self.time += ms
+
+
+class NullAudio:
+    """
+    Audio sink that plays nothing, busy until the clock passes length ms
+    Has the same calls as SongStream so it can stand in for AudioWrapper.song
+    """
+
+    __slots__ = ("clock", "length", "start", "paused", "volume")
+
+    def __init__(self, clock: VirtualClock, length: float) -> None:
+        self.clock = clock
+        self.length = length
+        self.start: float | None = None
+        # clock time the song was started at, None when stopped
+        self.paused = False
+        self.volume = 1.0
+
+    def play(self, source: Any = None, start: float = 0, fade_ms: int = 0) -> None:
+        self.start = self.clock.now() - start
+        self.paused = False
+
+    def seek(self, position: float) -> None:
+        self.start = self.clock.now() - position
+
+    def position(self) -> float:
+        if self.start is None:
+            return -1
+        return self.clock.now() - self.start
+
+    def pause(self) -> None:
+        self.paused = True
+
+    def unpause(self) -> None:
+        self.paused = False
+
+    def stop(self) -> None:
+        self.start = None
+
+    def fadeout(self, fadeout_time: int) -> None:
+        self.start = None
+
+    def set_volume(self, volume: float) -> None:
+        self.volume = volume
+
+    def get_busy(self) -> bool:
+        return not self.paused and 0 <= self.position() < self.length
+
+
+class Headless:
+    """
+    Runs a chart through the gameplay pipeline without a window, audio or wall clock
+
+    Every frame goes through Game.frame like in ingame_loop, with a VirtualClock and NullAudio in place
+    of the song clock and audio, stepped as fast as they'll go and fed key events from a script
+    instead of the keyboard. With render on notes are also drawn to an offscreen surface every frame
+    """
+
+    @staticmethod
+    def script(notes: NoteTable, offset: float = 0, tap_hold: int = 20) -> list[tuple[float, int, bool]]:
+        """
+        Key events that hit every note offset ms late, taps are held for tap_hold ms
+        """
+
+        events = list()
+        for i in range(len(notes)):
+            events.append((notes.time[i] + offset, notes.lane[i], True))
+            if notes.kind[i] == NoteTable.LONG:
+                events.append((notes.endtime[i] + offset, notes.lane[i], False))
+            else:
+                events.append((notes.time[i] + offset + tap_hold, notes.lane[i], False))
+        events.sort()
+        return events
+
+    @staticmethod
+    def read_script(path: Path) -> list[tuple[float, int, bool]]:
+        """
+        Reads key events from a text file, one "time,lane,pressed" per line (pressed is 1 or 0)
+        """
+
+        events = list()
+        for line in path.read_text().splitlines():
+            line = line.strip()
+            if line == "" or line.startswith("#"):
+                continue
+            time, lane, down = line.split(",")
+            events.append((float(time), int(lane), down.strip() == "1"))
+        events.sort()
+        return events
+
+    @staticmethod
+    def length(notes: NoteTable) -> float:
+        """How long a run of notes lasts, up to the last note's miss window closing"""
+        if len(notes) == 0:
+            return 0.0
+        return max(notes.endtime) + Conf.HIT_WINDOWS["miss"] + 1
+
+    @staticmethod
+    def run(
+        notes: NoteTable,
+        events: Sequence[tuple[float, int, bool]] = (),
+        auto: bool = False,
+        fps: float = 480,
+        render: bool = False,
+        start: float = 0,
+        until: float | None = None,
+    ) -> dict[str, Any]:
+        """
+        Plays notes from start ms to the end of the chart (or until ms), or until health runs out
+        Starting part way in leaves the notes before start unjudged
+        Returns the final score, health and judgement counts along with timing stats
+        """
+
+        from ..States.Game import Game
+
+        clock = VirtualClock(start)
+        length = Headless.length(notes)
+        audio = NullAudio(clock, length if until is None else min(length, until))
+        Game.begin(notes, auto, clock, start)
+        judge = Game.JUDGE
+        surface = Surface(Conf.SCREEN_SIZE) if render else None
+        frame = 1000 / fps
+        pending = bisect_left(events, (start,))
+        frames = 0
+
+        def poll() -> Sequence[tuple[float, int, bool]]:
+            """the script's key events up to now, as if they had been pressed during the frame"""
+            nonlocal pending
+            first = pending
+            now = clock.now()
+            while pending < len(events) and events[pending][0] <= now:
+                pending += 1
+            return () if auto else events[first:pending]
+
+        started = perf_counter()
+        audio.play(start=start)
+        playing = audio.get_busy()
+        while playing and judge.health > 0:
+            clock.advance(frame)
+            playing = Game.frame(surface, poll, audio)
+            frames += 1
+        wall = perf_counter() - started
+
+        return {
+            "score": judge.score,
+            "health": judge.health,
+            "failed": judge.health <= 0,
+            "counts": dict(judge.counts),
+            "notes": len(notes),
+            "frames": frames,
+            "sim_seconds": (clock.now() - start) / 1000,
+            "wall_seconds": wall,
+            "speed": (clock.now() - start) / 1000 / wall if wall else 0.0,
+        }
@@ -0,0 +1,53 @@
+from __future__ import annotations
+from collections import deque
+from collections.abc import Callable, Iterator, Sequence
+
+import pygame as pg
+
+from .Conf import Conf
+
+
+class InputPump:
+    """
+    Long-lived event pump for gameplay keys
+
+    SDL only hands out events on the main thread, so rather than a thread the pump is polled
+    as often as the loop gets the chance: around drawing, after presenting and while waiting for the next frame
+    Lane keys are stamped with the clock at the moment they're pulled off the SDL queue and appended to
+    a deque (append/popleft are atomic), everything else is left in control for the caller
+    Stamps are rounded to the microsecond so replays can store them exactly
+    """
+
+    __slots__ = ("clock", "lanes", "events", "control")
+
+    def __init__(self, clock: Callable[[], float], keys: Sequence[str] = Conf.KEYS) -> None:
+        self.clock = clock
+        self.lanes = {pg.key.key_code(name): lane for lane, name in enumerate(keys)}
+        # key code -> lane, looked up once instead of naming every event
+        self.events: deque[tuple[float, int, bool]] = deque()
+        # (time, lane, pressed) in arrival order
+        self.control: deque[pg.event.Event] = deque()
+        # quit and non-lane keys
+
+    def poll(self) -> None:
+        events = pg.event.get((pg.KEYDOWN, pg.KEYUP, pg.QUIT))
+        if not events:
+            return
+        now = round(self.clock() * 1000) / 1000
+        for event in events:
+            if event.type != pg.QUIT:
+                lane = self.lanes.get(event.key)
+                if lane is not None:
+                    self.events.append((now, lane, event.type == pg.KEYDOWN))
+                    continue
+            self.control.append(event)
+
+    def drain(self) -> Iterator[tuple[float, int, bool]]:
+        """Yields queued lane events oldest first, removing them as it goes"""
+        events = self.events
+        while events:
+            yield events.popleft()
+
+    def clear(self) -> None:
+        self.events.clear()
+        self.control.clear()
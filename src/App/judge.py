@@ -0,0 +1,146 @@
+from __future__ import annotations
+from array import array
+
+from .Conf import Conf
+from .notes import NoteTable
+
+
+class Judge:
+    """
+    Judgement engine for one play of a level
+
+    Every lane keeps its notes in time order with a cursor at the earliest unjudged one,
+    so a key press only ever looks at a single note and missed notes are swept by advancing cursors
+    Score, health and judgement counts live here as well
+    """
+
+    __slots__ = ("notes", "lanes", "heads", "holding", "score", "health", "counts")
+
+    MAX_HEALTH = 1000
+
+    def __init__(self, notes: NoteTable) -> None:
+        self.notes = notes
+        self.lanes = [array("i") for _ in range(NoteTable.LANES)]
+        for i, lane in enumerate(notes.lane):
+            self.lanes[lane].append(i)
+        self.heads = [0] * NoteTable.LANES
+        self.holding = [-1] * NoteTable.LANES
+        # long note per lane whose head was hit and is waiting for its release
+        self.score = 0
+        self.health = Judge.MAX_HEALTH
+        self.counts = dict.fromkeys(Conf.HIT_WINDOWS, 0)
+
+    @staticmethod
+    def grade(diff_time: float) -> str | None:
+        """
+        Returns the tightest hit window diff_time falls in, None if it misses them all
+        """
+
+        for judgement, window in Conf.HIT_WINDOWS.items():
+            if diff_time <= window:
+                return judgement
+        return None
+
+    def award(self, judgement: str) -> None:
+        self.score += Conf.SCORING[judgement]
+        self.health = min(self.health + Conf.HEALTH[judgement], Judge.MAX_HEALTH)
+        self.counts[judgement] += 1
+
+    def press(self, lane: int, time: float) -> str | None:
+        """
+        Judges the earliest unjudged note in lane against a key press at time
+        Presses outside the miss window of that note are ignored
+        """
+
+        self.sweep(time)
+        return self.hit(lane, time)
+
+    def hit(self, lane: int, time: float) -> str | None:
+        """
+        press without sweeping first, for callers that already know nothing is overdue
+        """
+
+        queue = self.lanes[lane]
+        head = self.heads[lane]
+        if head >= len(queue):
+            return None
+        i = queue[head]
+        notes = self.notes
+        judgement = Judge.grade(abs(notes.time[i] - time))
+        if judgement is None:
+            return None
+        self.award(judgement)
+        if notes.kind[i] == NoteTable.LONG:
+            notes.state[i] |= NoteTable.HEAD_HIT
+            self.holding[lane] = i
+        else:
+            notes.state[i] |= NoteTable.DONE
+        self.heads[lane] = head + 1
+        return judgement
+
+    def release(self, lane: int, time: float) -> str | None:
+        """
+        Judges the end of the long note being held in lane, releasing too early or late is a miss
+        """
+
+        i = self.holding[lane]
+        if i == -1:
+            return None
+        judgement = Judge.grade(abs(self.notes.endtime[i] - time)) or "miss"
+        self.award(judgement)
+        self.notes.state[i] |= NoteTable.DONE
+        self.holding[lane] = -1
+        return judgement
+
+    def skip(self, time: float) -> None:
+        """
+        Drops every note before time without judging it, for plays that start part way in
+        """
+
+        notes = self.notes
+        for lane, queue in enumerate(self.lanes):
+            head = self.heads[lane]
+            while head < len(queue) and notes.time[queue[head]] < time:
+                notes.state[queue[head]] |= NoteTable.DONE
+                head += 1
+            self.heads[lane] = head
+
+    def sweep(self, now: float) -> None:
+        """
+        Counts every note whose miss window has closed by now as a miss
+        """
+
+        notes = self.notes
+        late = now - Conf.HIT_WINDOWS["miss"]
+        for lane, queue in enumerate(self.lanes):
+            head = self.heads[lane]
+            while head < len(queue) and notes.time[queue[head]] < late:
+                self.award("miss")
+                notes.state[queue[head]] |= NoteTable.DONE
+                head += 1
+            self.heads[lane] = head
+
+            held = self.holding[lane]
+            if held != -1 and notes.endtime[held] < late:
+                self.award("miss")
+                notes.state[held] |= NoteTable.DONE
+                self.holding[lane] = -1
+
+    def autoplay(self, now: float, delay: int = 10) -> None:
+        """
+        Hits every head and tail that is delay ms old with a plusperfect
+        """
+
+        notes = self.notes
+        due = now - delay
+        for lane, queue in enumerate(self.lanes):
+            held = self.holding[lane]
+            if held != -1 and notes.endtime[held] <= due:
+                self.release(lane, notes.endtime[held])
+            head = self.heads[lane]
+            while head < len(queue) and notes.time[queue[head]] <= due:
+                i = queue[head]
+                self.hit(lane, notes.time[i])
+                head = self.heads[lane]
+                if self.holding[lane] == i and notes.endtime[i] <= due:
+                    self.release(lane, notes.endtime[i])
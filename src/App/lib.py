@@ -14,8 +14,8 @@ class Lib:
             Lib.PROJECT_ROOT,
             "Assets",
             "Levels",
-            level.path,
-            level.info["Background"],
+            level.parent_path,
+            level.info["Background"].strip('"'),
         )
 
     PROJECT_ROOT = GET_ROOT()
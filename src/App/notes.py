@@ -0,0 +1,145 @@
+from __future__ import annotations
+from array import array
+
+from .parser import HitObjects
+
+
+class NoteTable:
+    """
+    Column store for every note of a loaded level
+    Index i of every column belongs to the same note and rows are sorted by hit time
+
+    Replaces one sprite per note, so loading a chart only costs a few array appends
+    """
+
+    __slots__ = ("lane", "time", "endtime", "kind", "state")
+
+    TAP = 0
+    LONG = 1
+
+    # state flags
+    HEAD_HIT = 1 << 0
+    DONE = 1 << 1
+    GONE = 1 << 2
+    # scrolled off screen, set by NoteScheduler
+
+    LANES = 7
+
+    def __init__(self) -> None:
+        self.lane = array("b")
+        self.time = array("i")
+        self.endtime = array("i")
+        self.kind = array("b")
+        self.state = array("b")
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    @staticmethod
+    def from_hitobjects(notes: HitObjects) -> NoteTable:
+        """
+        Raises ValueError if the chart has objects that aren't mania notes
+        """
+
+        out = NoteTable()
+        rows = sorted(zip(notes.time, notes.x, notes.type, notes.endtime))
+        for time, x, obj_type, endtime in rows:
+            if obj_type & (1 << 0):
+                kind = NoteTable.TAP
+                endtime = time
+            elif obj_type & (1 << 7):
+                kind = NoteTable.LONG
+            else:
+                raise ValueError(f"Unsupported hit object type {obj_type} at {time}ms")
+            lane = x * NoteTable.LANES // 512  # osu!mania column from the x position
+            if not 0 <= lane < NoteTable.LANES:
+                raise ValueError(f"Hit object at {time}ms is outside the 7 lanes")
+            out.lane.append(lane)
+            out.time.append(time)
+            out.endtime.append(endtime)
+            out.kind.append(kind)
+        out.state = array("b", bytes(len(out.time)))
+        return out
+
+    def reset(self) -> None:
+        self.state = array("b", bytes(len(self.time)))
+
+
+class NoteScheduler:
+    """
+    Decides which notes of a NoteTable are on screen
+
+    Notes are spawned by a cursor over the time sorted table once they are less than lookahead ms away
+    A second cursor over the notes sorted by end time retires them once their tail is lookbehind ms old,
+    i.e. it has scrolled past the bottom of the screen
+    Both cursors only move forward, so a frame costs O(notes on screen) however long the chart is
+    """
+
+    __slots__ = (
+        "notes",
+        "active",
+        "spawn",
+        "retire",
+        "by_end",
+        "lookahead",
+        "lookbehind",
+    )
+
+    def __init__(self, notes: NoteTable, lookahead: float, lookbehind: float) -> None:
+        self.notes = notes
+        self.active: list[int] = list()
+        # indices of notes on screen that haven't been judged yet, in spawn order
+        self.spawn = 0
+        self.retire = 0
+        self.by_end = array(
+            "i", sorted(range(len(notes)), key=notes.endtime.__getitem__)
+        )
+        self.lookahead = lookahead
+        self.lookbehind = lookbehind
+
+    @staticmethod
+    def scroll_window(
+        constant: float,
+        multiplier: float,
+        screen_height: int,
+        note_height: int,
+        margin: int,
+    ) -> tuple[float, float]:
+        """
+        Returns (lookahead, lookbehind) in ms for the scroll settings
+
+        A note is drawn at (now - time) * multiplier + constant, so it enters at the top
+        (constant + note_height) / multiplier ms before its time and leaves through the bottom
+        (screen_height - constant) / multiplier ms after it
+        """
+
+        return (
+            (constant + note_height) / multiplier + margin,
+            (screen_height - constant) / multiplier + margin,
+        )
+
+    def update(self, now: float) -> None:
+        notes = self.notes
+        count = len(notes)
+        horizon = now + self.lookahead
+        spawn = self.spawn
+        while spawn < count and notes.time[spawn] <= horizon:
+            self.active.append(spawn)
+            spawn += 1
+        self.spawn = spawn
+
+        by_end = self.by_end
+        expiry = now - self.lookbehind
+        retire = self.retire
+        while retire < count and notes.endtime[by_end[retire]] < expiry:
+            notes.state[by_end[retire]] |= NoteTable.GONE
+            retire += 1
+        self.retire = retire
+
+        hidden = NoteTable.DONE | NoteTable.GONE
+        self.active = [i for i in self.active if not notes.state[i] & hidden]
+
+    def clear(self) -> None:
+        self.active.clear()
+        self.spawn = len(self.notes)
+        self.retire = len(self.notes)
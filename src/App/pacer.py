@@ -0,0 +1,106 @@
+from __future__ import annotations
+from array import array
+from collections.abc import Callable
+from time import perf_counter, sleep
+
+from pygame import display
+
+from .Conf import Conf
+
+
+class FramePacer:
+    """
+    Frame limiter that sleeps through most of the wait and only spins for the last Conf.FRAME_SPIN ms
+
+    Modes (Conf.FRAME_MODE):
+    vsync - caps at the display's refresh rate, on top of the display's own vsync
+    capped - caps at the fps each screen asks for, the window still asks for vsync
+    uncapped - never waits, only measures, and the window is opened without vsync
+
+    Frame deadlines are kept on a fixed grid so a late frame doesn't push every later one back,
+    unless it's over a whole frame late, then the grid restarts from now
+    The last Conf.FRAME_SAMPLES frame times are kept for percentiles()
+    """
+
+    __slots__ = ("mode", "spin", "deadline", "last", "times", "count")
+
+    MODES = ("vsync", "capped", "uncapped")
+
+    def __init__(self, mode: str = Conf.FRAME_MODE, spin: float = Conf.FRAME_SPIN) -> None:
+        if mode not in FramePacer.MODES:
+            raise ValueError(f"Unknown frame mode: {mode}")
+        self.mode = mode
+        self.spin = spin / 1000
+        self.deadline = perf_counter()
+        self.last = self.deadline
+        self.times = array("d", bytes(8 * Conf.FRAME_SAMPLES))
+        # frame times in ms, a ring buffer indexed by count
+        self.count = 0
+
+    def period(self, fps: int) -> float:
+        """Seconds per frame for a screen asking for fps"""
+        if self.mode == "uncapped" or fps <= 0:
+            return 0.0
+        if self.mode == "vsync":
+            fps = FramePacer.refresh_rate() or fps
+        return 1 / fps
+
+    @staticmethod
+    def refresh_rate() -> int:
+        """
+        The display's refresh rate, 0 if it can't be told
+        get_current_refresh_rate is pygame-ce only, stock pygame falls back to the fps asked for
+        """
+
+        current = getattr(display, "get_current_refresh_rate", None)
+        if current is None or not display.get_init():
+            return 0
+        return current()
+
+    def tick(self, fps: int, idle: Callable[[], None] | None = None) -> float:
+        """
+        Waits out the rest of the frame, calling idle (e.g. an input poll) while it waits
+        Returns the frame time in ms
+        """
+
+        period = self.period(fps)
+        if period:
+            self.deadline += period
+            now = perf_counter()
+            if now - self.deadline > period:
+                self.deadline = now
+            wake = self.deadline - self.spin
+            while now < wake:
+                sleep(min(wake - now, self.spin) if idle is not None else wake - now)
+                if idle is not None:
+                    idle()
+                now = perf_counter()
+            while now < self.deadline:
+                now = perf_counter()
+        else:
+            now = perf_counter()
+            self.deadline = now
+        if idle is not None:
+            idle()
+
+        frame = (now - self.last) * 1000
+        self.last = now
+        self.times[self.count % len(self.times)] = frame
+        self.count += 1
+        return frame
+
+    def percentiles(self, *ranks: float) -> list[float]:
+        """
+        Frame time in ms at each rank (0-100) over the recorded frames
+        """
+
+        recorded = sorted(self.times[: min(self.count, len(self.times))])
+        if not recorded:
+            return [0.0] * len(ranks)
+        top = len(recorded) - 1
+        return [recorded[round(rank / 100 * top)] for rank in ranks]
+
+    def reset(self) -> None:
+        self.deadline = perf_counter()
+        self.last = self.deadline
+        self.count = 0
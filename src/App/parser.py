@@ -1,18 +1,292 @@
 from __future__ import annotations
+from array import array
+import re
 from .lib import Lib
+from .Conf import Conf
+from .cache import LevelCache
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from multiprocessing import get_context
+from os import cpu_count, scandir, stat_result
 from pathlib import Path
+from threading import Event, Lock, Thread
 from typing import Any
 
 
 class Parser:
+    SNAPSHOT: dict[Path, tuple[int, int, Path]] = dict()
+    # size, mtime and parent folder of every level file as of the last scan
+    KEYS: dict[Path, tuple[str, str]] = dict()
+    # which App.LEVELS key each level file was stored under
+
+    @staticmethod
+    def level_dir() -> Path:
+        return Path(Lib.PROJECT_ROOT, "Assets", "Levels")
+
     @staticmethod
     def level_load() -> dict[list[str], Level_FILE]:
+        """
+        Full scan of the level folder, this resets the snapshot used by level_refresh
+
+        Parsed levels are served from LevelCache, only new or changed files get reparsed
+        Files are merged in sorted path order so the result doesn't depend on worker timing
+        """
+
         out = dict()
-        dir = Path(Lib.PROJECT_ROOT, "Assets", "Levels")
-        for parent_path in dir.iterdir():
-            for file in parent_path.rglob("*.osu"):
-                level = Level_FILE(file, parent_path)
-                out[(level.meta["TitleUnicode"], level.meta["Version"])] = level
+        Parser.SNAPSHOT.clear()
+        Parser.KEYS.clear()
+        LevelCache.load()
+        found = sorted(
+            (file, parent_path)
+            for parent_path in Parser.level_dir().iterdir()
+            for file in parent_path.rglob("*.osu")
+        )
+        Parser.add_levels(out, found)
+        LevelCache.prune({str(file) for file in Parser.SNAPSHOT})
+        LevelCache.save()
+        return out
+
+    @staticmethod
+    def level_refresh(
+        levels: dict[list[str], Level_FILE], folders: set[Path] | None = None
+    ) -> bool:
+        """
+        Diffs the level folder against the last scan and patches levels in place
+        Only files that were added, changed or removed are touched
+
+        If folders is None every level folder is walked (stat only, nothing is reread)
+        Otherwise only the given folders are looked at, e.g. the ones LevelWatcher reported
+
+        Returns whether anything changed
+        """
+
+        if folders is None:
+            folders = {path for path in Parser.level_dir().iterdir() if path.is_dir()}
+            folders |= {entry[2] for entry in Parser.SNAPSHOT.values()}
+        found: dict[Path, Path] = dict()
+        for parent_path in folders:
+            if parent_path.is_dir():
+                for file in parent_path.rglob("*.osu"):
+                    found[file] = parent_path
+
+        changed = False
+        for file, entry in list(Parser.SNAPSHOT.items()):
+            if entry[2] in folders and file not in found:
+                Parser.drop_level(levels, file)
+                changed = True
+        modified: list[tuple[Path, Path]] = list()
+        for file, parent_path in sorted(found.items()):
+            stat = file.stat()
+            entry = Parser.SNAPSHOT.get(file)
+            if entry is None or entry[:2] != (stat.st_size, stat.st_mtime_ns):
+                Parser.drop_level(levels, file)
+                modified.append((file, parent_path))
+        if modified:
+            Parser.add_levels(levels, modified)
+            changed = True
+
+        if changed:
+            LevelCache.prune({str(file) for file in Parser.SNAPSHOT})
+            LevelCache.save()
+        return changed
+
+    @staticmethod
+    def add_levels(
+        levels: dict[list[str], Level_FILE], found: list[tuple[Path, Path]]
+    ) -> None:
+        """
+        found is a list of (level file, parent folder) pairs
+        """
+
+        files = [file for file, _ in found]
+        stats = [file.stat() for file in files]
+        parsed = LevelCache.fetch_all(files, Parser.refresh_all)
+        for (file, parent_path), stat, data in zip(found, stats, parsed):
+            Parser.add_level(levels, file, parent_path, stat, data)
+
+    @staticmethod
+    def add_level(
+        levels: dict[list[str], Level_FILE],
+        file: Path,
+        parent_path: Path,
+        stat: stat_result | None = None,
+        data: dict[str, Any] | None = None,
+    ) -> None:
+        if stat is None:
+            stat = file.stat()
+        if data is None:
+            data = LevelCache.fetch(file, Level_FILE.parse_meta)
+        level = Level_FILE(file, parent_path, data)
+        key = (level.meta["TitleUnicode"], level.meta["Version"])
+        levels[key] = level
+        Parser.SNAPSHOT[file] = (stat.st_size, stat.st_mtime_ns, parent_path)
+        Parser.KEYS[file] = key
+
+    @staticmethod
+    def refresh_all(
+        paths: list[Path], known: list[bytes | None]
+    ) -> list[tuple[bytes, dict[str, Any] | None]]:
+        """
+        Hashes and parses level headers across a process pool (see LevelCache.refresh),
+        results come back in the order of paths
+        Small batches (below Conf.SCAN_PARALLEL_MIN) aren't worth the pool startup and stay serial
+
+        Workers are spawned rather than forked, by the time the menu rescans pygame, the mixer
+        and the watcher thread are running and a forked copy of them isn't safe
+        """
+
+        workers = Conf.SCAN_WORKERS or cpu_count() or 1
+        workers = min(workers, len(paths))
+
+        def serial() -> list[tuple[bytes, dict[str, Any] | None]]:
+            return [
+                LevelCache.refresh(path, digest, Level_FILE.parse_meta)
+                for path, digest in zip(paths, known)
+            ]
+
+        if workers <= 1 or len(paths) < Conf.SCAN_PARALLEL_MIN:
+            return serial()
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+                chunksize = max(1, len(paths) // (workers * 4))
+                return list(
+                    pool.map(
+                        LevelCache.refresh,
+                        paths,
+                        known,
+                        repeat(Level_FILE.parse_meta),
+                        chunksize=chunksize,
+                    )
+                )
+        except (OSError, BrokenProcessPool):
+            return serial()
+
+    @staticmethod
+    def drop_level(levels: dict[list[str], Level_FILE], file: Path) -> None:
+        Parser.SNAPSHOT.pop(file, None)
+        key = Parser.KEYS.pop(file, None)
+        if key in levels and levels[key].path == file:
+            del levels[key]
+            # another file with the same title and version may have been shadowed by this one
+            for other, other_key in Parser.KEYS.items():
+                if other_key == key:
+                    Parser.add_level(levels, other, Parser.SNAPSHOT[other][2])
+                    break
+
+
+class LevelWatcher:
+    """
+    Optional background poller for the level folder
+
+    Every poll stats each folder under the level folder once and nothing inside them,
+    only folders whose mtime moved are listed again, to find subfolders added or removed
+    A folder's mtime changes when an entry in it is added, removed or renamed (which is also how
+    most editors save), a chart rewritten in place leaves it alone and is only seen by a full
+    Parser.level_refresh
+    Level folders with a change anywhere inside are collected until Parser.level_refresh drains
+    them, and polling is paused while a level is played
+    """
+
+    THREAD: Thread | None = None
+    STOP = Event()
+    PAUSED = Event()
+    LOCK = Lock()
+    CHANGED: set[Path] = set()
+    FOLDERS: dict[Path, tuple[int, Path | None]] = dict()
+    # mtime and level folder of every folder as of the last poll, None for the level dir itself
+
+    @staticmethod
+    def running() -> bool:
+        return LevelWatcher.THREAD is not None and LevelWatcher.THREAD.is_alive()
+
+    @staticmethod
+    def start(interval: float) -> None:
+        if LevelWatcher.running():
+            return
+        LevelWatcher.STOP.clear()
+        LevelWatcher.PAUSED.clear()
+        LevelWatcher.FOLDERS = dict()
+        LevelWatcher.walk(LevelWatcher.FOLDERS, Parser.level_dir(), None)
+        LevelWatcher.THREAD = Thread(
+            target=LevelWatcher.watch, args=(interval,), daemon=True
+        )
+        LevelWatcher.THREAD.start()
+
+    @staticmethod
+    def stop() -> None:
+        LevelWatcher.STOP.set()
+        if LevelWatcher.THREAD is not None:
+            LevelWatcher.THREAD.join()
+            LevelWatcher.THREAD = None
+
+    @staticmethod
+    def pause() -> None:
+        LevelWatcher.PAUSED.set()
+
+    @staticmethod
+    def resume() -> None:
+        LevelWatcher.PAUSED.clear()
+
+    @staticmethod
+    def walk(out: dict[Path, tuple[int, Path | None]], path: Path, level: Path | None) -> None:
+        """
+        Adds path and every folder below it to out
+        level is the level folder path belongs to, None for the level dir
+        """
+
+        try:
+            out[path] = (path.stat().st_mtime_ns, level)
+            with scandir(path) as entries:
+                folders = [Path(entry.path) for entry in entries if entry.is_dir()]
+        except OSError:
+            # removed while listing, the next poll sees it gone
+            return
+        for folder in folders:
+            LevelWatcher.walk(out, folder, level or folder)
+
+    @staticmethod
+    def watch(interval: float) -> None:
+        while not LevelWatcher.STOP.wait(interval):
+            if not LevelWatcher.PAUSED.is_set():
+                LevelWatcher.poll()
+
+    @staticmethod
+    def poll() -> None:
+        old = LevelWatcher.FOLDERS
+        new: dict[Path, tuple[int, Path | None]] = dict()
+        changed = set()
+        for path, (mtime, level) in old.items():
+            try:
+                now = path.stat().st_mtime_ns
+            except OSError:
+                if level is not None:
+                    changed.add(level)
+                continue
+            new[path] = (now, level)
+            if now == mtime:
+                continue
+            if level is not None:
+                changed.add(level)
+            try:
+                with scandir(path) as entries:
+                    folders = [Path(entry.path) for entry in entries if entry.is_dir()]
+            except OSError:
+                continue
+            for folder in folders:
+                if folder not in old:
+                    LevelWatcher.walk(new, folder, level or folder)
+                    changed.add(level or folder)
+        LevelWatcher.FOLDERS = new
+        if changed:
+            with LevelWatcher.LOCK:
+                LevelWatcher.CHANGED |= changed
+
+    @staticmethod
+    def drain() -> set[Path]:
+        with LevelWatcher.LOCK:
+            out = LevelWatcher.CHANGED
+            LevelWatcher.CHANGED = set()
         return out
 
 
@@ -21,34 +295,49 @@ class Level_FILE:
     Stores level meta
     """
 
-    __slots__ = ("data", "notes", "tpoints", "meta", "info", "diff", "parent_path")
+    __slots__ = (
+        "data",
+        "_notes",
+        "_tpoints",
+        "meta",
+        "info",
+        "diff",
+        "path",
+        "parent_path",
+    )
+
+    BODY_SECTIONS = (b"[TimingPoints]", b"[HitObjects]")
 
     @staticmethod
     def parse_meta(path: Path) -> dict[str, Any]:
         """
         Horrific type safety but gets the job done
 
-        Reads the .osu file and returns a dictionary containing the level data in several nested dictionaries and lists
+        Reads the header of the .osu file ([General], [Metadata], [Difficulty], [Events])
+        and returns a dictionary of nested dictionaries
+        Reading stops at the first body section, its byte offset is kept under "O" for parse_body
         """
 
         General: dict[str, str] = dict()
         Metadata: dict[str, str | list[str]] = dict()
         Difficulty: dict[str, str] = dict()
-        TimingPoints: list[list[str]] = list()
-        HitObjects: list[list[str]] = list()
 
         out = {
             "G": General,
             "M": Metadata,
             "D": Difficulty,
-            "T": TimingPoints,
-            "H": HitObjects,
+            "O": 0,
         }
 
-        with path.open() as level:
-            meta = level.readlines()
+        with path.open("rb") as level:
             section = ""
-            for line in meta:
+            while True:
+                offset = level.tell()
+                raw = level.readline()
+                if raw == b"" or raw.startswith(Level_FILE.BODY_SECTIONS):
+                    out["O"] = offset
+                    break
+                line = raw.decode("utf-8-sig")
                 if line.strip() == "":
                     section = ""
                     continue
@@ -64,21 +353,153 @@ class Level_FILE:
                 elif section == "Difficulty":
                     pair = line.split(":", 1)
                     out["D"][pair[0].strip()] = pair[1].strip()
-                elif section == "TimingPoints":
-                    out["T"].append(line.split(","))
-                elif section == "HitObjects":
-                    out["H"].append(line.split(","))
                 elif section == "Events":
                     if not line.startswith("//"):
                         out["G"]["Background"] = line.split(",")[2]
 
         return out
 
-    def __init__(self, path: Path, parent: Path) -> None:
-        self.data = Level_FILE.parse_meta(path)
-        self.notes: list[list[str]] = self.data["H"]
-        self.tpoints: list[list[str]] = self.data["T"]
+    @staticmethod
+    def parse_body(path: Path, offset: int = 0) -> dict[str, Any]:
+        """
+        Reads [TimingPoints] and [HitObjects] starting from the offset found by parse_meta
+
+        The body is read as one bytes object and each section is matched in a single regex pass,
+        only the fields that are actually used get converted and they go straight into typed columns
+        """
+
+        with path.open("rb") as level:
+            level.seek(offset)
+            body = level.read()
+
+        return {
+            "T": TimingPoints.parse(body, *Level_FILE.section(body, b"[TimingPoints]")),
+            "H": HitObjects.parse(body, *Level_FILE.section(body, b"[HitObjects]")),
+        }
+
+    @staticmethod
+    def section(body: bytes, header: bytes) -> tuple[int, int]:
+        """
+        Returns the byte range of a section's lines, empty if the section is missing
+        """
+
+        start = body.find(header)
+        if start == -1:
+            return (0, 0)
+        start += len(header)
+        end = body.find(b"\n[", start)
+        return (start, len(body) if end == -1 else end)
+
+    def __init__(
+        self, path: Path, parent: Path, data: dict[str, Any] | None = None
+    ) -> None:
+        """
+        Only the header is parsed here, data can be passed in when it has already been parsed, e.g. from LevelCache
+        Notes and timing points are read from the file the first time they're needed
+        """
+
+        self.data = Level_FILE.parse_meta(path) if data is None else data
+        self._notes: HitObjects | None = None
+        self._tpoints: TimingPoints | None = None
         self.meta: dict[str, str | list[str]] = self.data["M"]
         self.info: dict[str, str] = self.data["G"]
         self.diff: dict[str, str] = self.data["D"]
+        self.path = path
         self.parent_path = parent
+
+    def load_body(self) -> None:
+        if self._notes is None:
+            body = Level_FILE.parse_body(self.path, self.data["O"])
+            self._notes = body["H"]
+            self._tpoints = body["T"]
+
+    def release_body(self) -> None:
+        """
+        Drops the notes and timing points again once the level is in memory
+        """
+
+        self._notes = None
+        self._tpoints = None
+
+    @property
+    def notes(self) -> HitObjects:
+        self.load_body()
+        return self._notes
+
+    @property
+    def tpoints(self) -> TimingPoints:
+        self.load_body()
+        return self._tpoints
+
+
+class HitObjects:
+    """
+    [HitObjects] stored as typed columns, index i of every column belongs to the same note
+    endtime equals time for anything that isn't a long note
+    """
+
+    __slots__ = ("x", "time", "type", "endtime")
+
+    PATTERN = re.compile(rb"^(-?\d+),-?\d+,(-?\d+),(\d+),\d+(?:,(-?\d+))?", re.MULTILINE)
+    # x,y,time,type,hitSound,endTime:hitSample - long notes put their end time in front of the sample,
+    # taps may stop after hitSound
+
+    def __init__(self) -> None:
+        self.x = array("i")
+        self.time = array("i")
+        self.type = array("i")
+        self.endtime = array("i")
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    @staticmethod
+    def parse(body: bytes, start: int, end: int) -> HitObjects:
+        out = HitObjects()
+        rows = HitObjects.PATTERN.findall(body, start, end)
+        if not rows:
+            return out
+        x, time, type, endtime = zip(*rows)
+        out.x = array("i", map(int, x))
+        out.time = array("i", map(int, time))
+        out.type = array("i", map(int, type))
+        out.endtime = array(
+            "i",
+            [
+                int(e) if t & (1 << 7) else s
+                for e, t, s in zip(endtime, out.type, out.time)
+            ],
+        )
+        return out
+
+
+class TimingPoints:
+    """
+    [TimingPoints] stored as typed columns
+    Inherited points keep their negative beat length (a scroll speed multiplier in osu!)
+    """
+
+    __slots__ = ("time", "beat_length", "meter")
+
+    PATTERN = re.compile(rb"^(-?[\d.]+),(-?[\d.eE+-]+)(?:,(\d+))?", re.MULTILINE)
+    # time,beatLength,meter,... - very old files may stop after beatLength
+
+    def __init__(self) -> None:
+        self.time = array("d")
+        self.beat_length = array("d")
+        self.meter = array("i")
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    @staticmethod
+    def parse(body: bytes, start: int, end: int) -> TimingPoints:
+        out = TimingPoints()
+        rows = TimingPoints.PATTERN.findall(body, start, end)
+        if not rows:
+            return out
+        time, beat_length, meter = zip(*rows)
+        out.time = array("d", map(float, time))
+        out.beat_length = array("d", map(float, beat_length))
+        out.meter = array("i", [int(m) if m else 4 for m in meter])
+        return out
@@ -0,0 +1,155 @@
+from __future__ import annotations
+from array import array
+from collections import deque
+from json import dump
+from pathlib import Path
+from time import perf_counter_ns, strftime
+
+from pygame import font, Surface
+
+from .clock import SongClock
+from .compositor import Compositor
+from .Conf import Conf
+from .pacer import FramePacer
+
+
+class Profiler:
+    """
+    Per phase timings for the game loop
+
+    The loop calls lap(phase) after each phase, which times it from the end of the previous one,
+    so a frame costs one perf_counter_ns call per phase and nothing at all while disabled
+    (the loop checks ENABLED before calling in)
+    The last Conf.PROFILE_SAMPLES laps of each phase are kept in a ring buffer for percentiles,
+    and every lap is kept (up to Conf.PROFILE_TRACE_EVENTS) for a Chrome trace written by dump()
+    """
+
+    ENABLED = Conf.PROFILE
+    SAMPLES: dict[str, array] = dict()
+    # phase -> lap times in ns, a ring buffer indexed by COUNTS[phase]
+    COUNTS: dict[str, int] = dict()
+    TRACE: deque[tuple[str, int, int]] = deque(maxlen=Conf.PROFILE_TRACE_EVENTS)
+    # (phase, start ns, duration ns)
+    OVERLAY_INTERVAL = 250_000_000
+    # ns between overlay redraws, so its text isn't rendered every frame
+    _last = 0
+    _overlay: Surface | None = None
+    _overlay_at = 0
+
+    @staticmethod
+    def toggle() -> bool:
+        Profiler.ENABLED = not Profiler.ENABLED
+        Profiler.start()
+        return Profiler.ENABLED
+
+    @staticmethod
+    def start() -> None:
+        """Starts timing the first phase from now"""
+        Profiler._last = perf_counter_ns()
+
+    @staticmethod
+    def lap(phase: str) -> None:
+        now = perf_counter_ns()
+        start = Profiler._last
+        Profiler._last = now
+        duration = now - start
+        samples = Profiler.SAMPLES.get(phase)
+        if samples is None:
+            samples = array("q", bytes(8 * Conf.PROFILE_SAMPLES))
+            Profiler.SAMPLES[phase] = samples
+            Profiler.COUNTS[phase] = 0
+        count = Profiler.COUNTS[phase]
+        samples[count % len(samples)] = duration
+        Profiler.COUNTS[phase] = count + 1
+        Profiler.TRACE.append((phase, start, duration))
+
+    @staticmethod
+    def percentiles(phase: str, *ranks: float) -> list[float]:
+        """
+        Lap time in us at each rank (0-100) over the recorded laps of phase
+        """
+
+        samples = Profiler.SAMPLES.get(phase)
+        if samples is None:
+            return [0.0] * len(ranks)
+        recorded = sorted(samples[: min(Profiler.COUNTS[phase], len(samples))])
+        top = len(recorded) - 1
+        return [recorded[round(rank / 100 * top)] / 1000 for rank in ranks]
+
+    @staticmethod
+    def overlay(
+        fnt: font.Font,
+        pacer: FramePacer | None = None,
+        clock: SongClock | None = None,
+        compositor: Compositor | None = None,
+    ) -> Surface:
+        """
+        p50/p95/p99 of every phase as a text block, redrawn at most every OVERLAY_INTERVAL
+        With a pacer the whole frame time is shown under them, with a clock its drift from the audio
+        and with a compositor how much of each frame it didn't have to send to the display
+        """
+
+        now = perf_counter_ns()
+        if Profiler._overlay is not None and now - Profiler._overlay_at < Profiler.OVERLAY_INTERVAL:
+            return Profiler._overlay
+        lines = [f"{'phase':<16}{'p50':>9}{'p95':>9}{'p99':>9} us"]
+        for phase in Profiler.SAMPLES:
+            p50, p95, p99 = Profiler.percentiles(phase, 50, 95, 99)
+            lines.append(f"{phase:<16}{p50:>9.0f}{p95:>9.0f}{p99:>9.0f}")
+        if pacer is not None:
+            p50, p95, p99 = (ms * 1000 for ms in pacer.percentiles(50, 95, 99))
+            lines.append(f"{'frame':<16}{p50:>9.0f}{p95:>9.0f}{p99:>9.0f}")
+        if clock is not None:
+            lines.append(f"{'sync drift':<16}{clock.drift:>+9.1f} ms, max {clock.max_drift:.1f} ms")
+        if compositor is not None:
+            saved = compositor.saved_per_frame()
+            lines.append(
+                f"{'pixels saved':<16}{saved:>9.0f} per frame, {saved / compositor.area:.0%}"
+            )
+        height = fnt.get_linesize()
+        out = Surface((max(fnt.size(line)[0] for line in lines), height * len(lines)))
+        out.blits(
+            [
+                (fnt.render(line, True, (255, 255, 255)), (0, height * row))
+                for row, line in enumerate(lines)
+            ],
+            doreturn=False,
+        )
+        Profiler._overlay = out
+        Profiler._overlay_at = now
+        return out
+
+    @staticmethod
+    def dump(path: Path | None = None) -> Path | None:
+        """
+        Writes the recorded laps as Chrome trace / Perfetto JSON and forgets them
+        Returns where it wrote, None if there was nothing to write
+        """
+
+        if not Profiler.TRACE:
+            return None
+        if path is None:
+            path = Path(Conf.TRACE_DIR, f"trace-{strftime('%Y%m%d-%H%M%S')}.json")
+        events = [
+            {
+                "name": phase,
+                "ph": "X",
+                "ts": start / 1000,
+                "dur": duration / 1000,
+                "pid": 1,
+                "tid": 1,
+            }
+            for phase, start, duration in Profiler.TRACE
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w") as f:
+            dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        Profiler.TRACE.clear()
+        return path
+
+    @staticmethod
+    def reset() -> None:
+        Profiler.SAMPLES.clear()
+        Profiler.COUNTS.clear()
+        Profiler.TRACE.clear()
+        Profiler._overlay = None
@@ -0,0 +1,180 @@
+from __future__ import annotations
+from hashlib import blake2b
+from pathlib import Path
+from time import strftime
+
+from .batch import BatchJudge, BatchResult
+from .Conf import Conf
+from .judge import Judge
+from .lib import Lib
+from .notes import NoteTable
+from .simulation import Simulation
+
+
+def write_varint(out: bytearray, value: int) -> None:
+    """Unsigned LEB128, 7 bits per byte with the high bit set on every byte but the last"""
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    """Returns the value and the position after it"""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def unzigzag(value: int) -> int:
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+
+class Replay:
+    """
+    Every key event judged during one play, plus what the play scored
+
+    Stored as a small binary file:
+    magic, version, then varints for the flags (bit 0: autoplay), simulation rate, the step the
+    play ended on, score, zigzagged health, each judgement count in Conf.HIT_WINDOWS order,
+    the 16 byte chart digest, the length prefixed chart path and the event count
+    Each event is then one varint: zigzagged us since the previous event << 4 | lane << 1 | pressed
+    (zigzagged because a clock resync can step time back)
+    Event times are stamped in whole microseconds (see InputPump) so they round trip exactly
+    """
+
+    __slots__ = ("chart", "digest", "auto", "rate", "end", "events", "score", "health", "counts")
+
+    MAGIC = b"7KRP"
+    VERSION = 1
+
+    def __init__(self, chart: Path, auto: bool = False, rate: int = Conf.SIM_RATE) -> None:
+        self.chart = chart
+        self.digest = Replay.chart_digest(chart)
+        self.auto = auto
+        self.rate = rate
+        self.end = 0
+        # simulation step the play stopped on
+        self.events: list[tuple[float, int, bool]] = list()
+        self.score = 0
+        self.health = Judge.MAX_HEALTH
+        self.counts = dict.fromkeys(Conf.HIT_WINDOWS, 0)
+
+    @staticmethod
+    def chart_digest(chart: Path) -> bytes:
+        return blake2b(chart.read_bytes(), digest_size=16).digest()
+
+    def finish(self, simulation: Simulation) -> None:
+        """Takes the final result from the simulation that played the events"""
+        judge = simulation.judge
+        self.end = simulation.ticks
+        self.score = judge.score
+        self.health = judge.health
+        self.counts = dict(judge.counts)
+
+    def encode(self) -> bytes:
+        out = bytearray(Replay.MAGIC)
+        out.append(Replay.VERSION)
+        write_varint(out, int(self.auto))
+        write_varint(out, self.rate)
+        write_varint(out, self.end)
+        write_varint(out, self.score)
+        write_varint(out, zigzag(self.health))
+        for judgement in Conf.HIT_WINDOWS:
+            write_varint(out, self.counts[judgement])
+        out += self.digest
+        try:
+            chart = self.chart.relative_to(Lib.PROJECT_ROOT).as_posix()
+        except ValueError:
+            chart = self.chart.as_posix()
+        chart = chart.encode()
+        write_varint(out, len(chart))
+        out += chart
+        write_varint(out, len(self.events))
+        previous = 0
+        for time, lane, down in self.events:
+            us = round(time * 1000)
+            write_varint(out, zigzag(us - previous) << 4 | lane << 1 | down)
+            previous = us
+        return bytes(out)
+
+    @staticmethod
+    def decode(data: bytes) -> Replay:
+        """
+        Raises ValueError for anything that isn't a replay this version can read
+        """
+
+        if data[:4] != Replay.MAGIC or len(data) < 5 or data[4] != Replay.VERSION:
+            raise ValueError("Not a replay file, or one from another version")
+        try:
+            pos = 5
+            flags, pos = read_varint(data, pos)
+            rate, pos = read_varint(data, pos)
+            end, pos = read_varint(data, pos)
+            score, pos = read_varint(data, pos)
+            health, pos = read_varint(data, pos)
+            counts = dict()
+            for judgement in Conf.HIT_WINDOWS:
+                counts[judgement], pos = read_varint(data, pos)
+            digest = data[pos : pos + 16]
+            pos += 16
+            length, pos = read_varint(data, pos)
+            chart = Path(data[pos : pos + length].decode())
+            pos += length
+            count, pos = read_varint(data, pos)
+            events = list()
+            us = 0
+            for _ in range(count):
+                value, pos = read_varint(data, pos)
+                us += unzigzag(value >> 4)
+                events.append((us / 1000, value >> 1 & 0x7, bool(value & 1)))
+        except IndexError:
+            raise ValueError("Replay file is truncated")
+
+        replay = Replay.__new__(Replay)
+        replay.chart = chart if chart.is_absolute() else Path(Lib.PROJECT_ROOT, chart)
+        replay.digest = digest
+        replay.auto = bool(flags & 1)
+        replay.rate = rate
+        replay.end = end
+        replay.events = events
+        replay.score = score
+        replay.health = unzigzag(health)
+        replay.counts = counts
+        return replay
+
+    def save(self, path: Path | None = None) -> Path:
+        if path is None:
+            path = Path(Conf.REPLAY_DIR, f"{strftime('%Y%m%d-%H%M%S')}-{self.digest.hex()[:8]}.rpl")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(self.encode())
+        return path
+
+    @staticmethod
+    def load(path: Path) -> Replay:
+        return Replay.decode(path.read_bytes())
+
+    def play(self, notes: NoteTable) -> BatchResult:
+        """
+        Judges the recorded events against notes in one batch pass
+        Same steps as the play itself, so the result is exactly where the play's judge ended up
+        """
+
+        return BatchJudge.judge(notes, self.events, self.auto, self.end, self.rate)
+
+    def matches(self, judge: Judge | BatchResult) -> bool:
+        return (
+            judge.score == self.score
+            and judge.health == self.health
+            and judge.counts == self.counts
+        )
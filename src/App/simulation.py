@@ -0,0 +1,79 @@
+from __future__ import annotations
+from collections import deque
+from collections.abc import Iterable
+from math import floor
+
+from .Conf import Conf
+from .judge import Judge
+
+
+class Simulation:
+    """
+    Fixed rate judgement, decoupled from how often frames are drawn
+
+    advance(now) catches up in steps of 1000 / Conf.SIM_RATE ms, every step applies the key events
+    stamped inside it (judged at their own timestamps) and then sweeps or autoplays up to its end,
+    so misses are found within a step of their window closing however long a frame takes
+    The renderer only reads the resulting judge and note state
+    """
+
+    __slots__ = ("judge", "auto", "step", "ticks", "queue")
+
+    def __init__(
+        self, judge: Judge, auto: bool = False, rate: int = Conf.SIM_RATE, start: float = 0
+    ) -> None:
+        self.judge = judge
+        self.auto = auto
+        self.step = 1000 / rate
+        self.ticks = int(start // self.step)
+        # steps run so far, sim time is ticks * step
+        self.queue: deque[tuple[float, int, bool]] = deque()
+        # (time, lane, pressed) not yet applied
+
+    @property
+    def time(self) -> float:
+        return self.ticks * self.step
+
+    def feed(self, events: Iterable[tuple[float, int, bool]]) -> list[tuple[float, int, bool]]:
+        """
+        Queues key events, they must come in time order
+        An event stamped at or before steps that already ran (the song clock resynced backwards)
+        is moved to the next microsecond after them, so it's applied in the next step both here
+        and when a replay of it is judged in batch
+        Returns the events as queued, which is what a replay has to record
+        """
+
+        time = self.time
+        after = (floor(time * 1000) + 1) / 1000
+        queued = [
+            event if event[0] > time else (after, event[1], event[2])
+            for event in events
+        ]
+        self.queue.extend(queued)
+        return queued
+
+    def advance(self, now: float) -> int:
+        """
+        Runs every whole step up to now, returns how many ran
+        """
+
+        judge = self.judge
+        queue = self.queue
+        step = self.step
+        ticks = self.ticks
+        start = ticks
+        while (ticks + 1) * step <= now:
+            ticks += 1
+            end = ticks * step
+            while queue and queue[0][0] <= end:
+                event_time, lane, down = queue.popleft()
+                if down:
+                    judge.press(lane, event_time)
+                else:
+                    judge.release(lane, event_time)
+            if self.auto:
+                judge.autoplay(end)
+            else:
+                judge.sweep(end)
+        self.ticks = ticks
+        return ticks - start
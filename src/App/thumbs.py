@@ -0,0 +1,123 @@
+from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import blake2b
+from pathlib import Path
+from threading import Lock
+
+import pygame as pg
+from pygame import image, transform, Surface
+
+from .Conf import Conf
+
+
+class ThumbnailCache:
+    """
+    Small pre-scaled copies of level backgrounds for the level select screen
+
+    Backgrounds are decoded and downscaled on worker threads, written to STO keyed by a hash of the source
+    file and handed to the main thread, which keeps the most recently used ones in memory
+    Until a thumbnail is ready get() returns a placeholder
+    """
+
+    SIZE = (300, 300)
+    MEMORY: OrderedDict[Path, Surface] = OrderedDict()
+    # source path -> thumbnail, least recently used first
+    PENDING: set[Path] = set()
+    READY: dict[Path, Surface | None] = dict()
+    # filled by the workers, None when the source couldn't be loaded
+    MISSING: set[Path] = set()
+    LOCK = Lock()
+    EXECUTOR = ThreadPoolExecutor(max_workers=2)
+    _placeholder: Surface | None = None
+
+    @staticmethod
+    def placeholder() -> Surface:
+        if ThumbnailCache._placeholder is None:
+            ThumbnailCache._placeholder = Surface(ThumbnailCache.SIZE)
+            ThumbnailCache._placeholder.fill((40, 40, 40))
+        return ThumbnailCache._placeholder
+
+    @staticmethod
+    def get(path: Path) -> Surface:
+        thumb = ThumbnailCache.MEMORY.get(path)
+        if thumb is not None:
+            ThumbnailCache.MEMORY.move_to_end(path)
+            return thumb
+
+        ThumbnailCache.collect()
+        thumb = ThumbnailCache.MEMORY.get(path)
+        if thumb is not None:
+            return thumb
+        if path not in ThumbnailCache.PENDING and path not in ThumbnailCache.MISSING:
+            ThumbnailCache.PENDING.add(path)
+            ThumbnailCache.EXECUTOR.submit(ThumbnailCache.load, path)
+        return ThumbnailCache.placeholder()
+
+    @staticmethod
+    def collect() -> None:
+        """
+        Moves finished thumbnails into memory, converting them for the display on the way
+        """
+
+        with ThumbnailCache.LOCK:
+            ready = ThumbnailCache.READY
+            ThumbnailCache.READY = dict()
+        for path, thumb in ready.items():
+            ThumbnailCache.PENDING.discard(path)
+            if thumb is None:
+                ThumbnailCache.MISSING.add(path)
+                continue
+            try:
+                thumb = thumb.convert()
+            except pg.error:
+                pass
+            ThumbnailCache.MEMORY[path] = thumb
+            if len(ThumbnailCache.MEMORY) > Conf.THUMB_CACHE_SIZE:
+                ThumbnailCache.MEMORY.popitem(last=False)
+
+    @staticmethod
+    def scale(source: Surface) -> Surface:
+        try:
+            return transform.smoothscale(source, ThumbnailCache.SIZE)
+        except ValueError:  # smoothscale only takes 24 and 32 bit surfaces
+            return transform.scale(source, ThumbnailCache.SIZE)
+
+    @staticmethod
+    def load(path: Path) -> None:
+        """
+        Worker side, reads the thumbnail from STO or makes it from the source image
+        """
+
+        try:
+            raw = path.read_bytes()
+        except OSError:
+            thumb = None
+        else:
+            key = blake2b(raw, digest_size=16).hexdigest()
+            width, height = ThumbnailCache.SIZE
+            stored = Path(Conf.THUMB_DIR, f"{key}-{width}x{height}.rgb")
+            thumb = None
+            if stored.exists():
+                try:
+                    thumb = image.frombytes(stored.read_bytes(), ThumbnailCache.SIZE, "RGB")
+                except (ValueError, OSError):
+                    # truncated or corrupt, made again from the source below
+                    try:
+                        stored.unlink()
+                    except OSError:
+                        pass
+            if thumb is None:
+                try:
+                    thumb = ThumbnailCache.scale(image.load(path))
+                except pg.error:
+                    thumb = None
+                else:
+                    try:
+                        stored.parent.mkdir(parents=True, exist_ok=True)
+                        stored.write_bytes(image.tobytes(thumb, "RGB"))
+                    except OSError:
+                        # only the copy in STO is lost, a partly written one is caught above next time
+                        pass
+        with ThumbnailCache.LOCK:
+            ThumbnailCache.READY[path] = thumb
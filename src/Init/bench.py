@@ -0,0 +1,283 @@
+"""
+Times the engine's hot paths and compares them against a stored baseline
+
+python3 -m src.Init.bench [--sizes 10000,50000,200000] [--repeat N] [--out FILE] [--save-baseline] [--compare [FILE]]
+Results are written as JSON to Conf.BENCH_DIR/latest.json unless --out says otherwise
+--compare exits with 1 if any benchmark got slower or hungrier than the threshold allows
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from collections.abc import Callable
+from pathlib import Path
+from random import Random
+from statistics import median
+from time import perf_counter
+from typing import Any
+import tracemalloc
+
+
+SYNTHETIC_HEADER = """osu file format v14
+
+[General]
+AudioFilename: audio.mp3
+PreviewTime: 0
+Mode: 3
+
+[Metadata]
+Title:Synthetic
+TitleUnicode:Synthetic
+Artist:bench
+Creator:bench
+Version:{count} notes
+
+[Difficulty]
+CircleSize:7
+OverallDifficulty:8
+
+[Events]
+0,0,"bg.jpg",0,0
+
+[TimingPoints]
+0,500,4,2,0,50,1,0
+
+[HitObjects]
+"""
+
+
+def synthetic_chart(path: Path, count: int, seconds: int = 300, seed: int = 7) -> Path:
+    """
+    Writes a chart of count notes spread over seconds, about a fifth of them long notes
+    Notes in a lane never overlap, the same seed always gives the same chart
+    """
+
+    rng = Random(seed)
+    free = [0] * 7
+    # time each lane is free again
+    step = seconds * 1000 / count
+    lines = list()
+    for i in range(count):
+        time = int(1000 + i * step)
+        lane = rng.randrange(7)
+        if free[lane] > time:
+            lane = min(range(7), key=free.__getitem__)
+        time = max(time, free[lane])
+        x = (2 * lane + 1) * 256 // 7
+        if rng.random() < 0.2:
+            end = time + rng.randint(100, 1000)
+            lines.append(f"{x},192,{time},128,0,{end}:0:0:0:0:")
+        else:
+            end = time
+            lines.append(f"{x},192,{time},1,0,0:0:0:0:")
+        free[lane] = end + 1
+    path.write_text(SYNTHETIC_HEADER.format(count=count) + "\n".join(lines) + "\n")
+    return path
+
+
+def measure(run: Callable[[], Any], repeat: int, setup: Callable[[], None] | None = None) -> dict[str, Any]:
+    """
+    Times repeat runs, then does one more under tracemalloc for the peak memory
+    Returns the last run's result under "result"
+    """
+
+    times = list()
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = perf_counter()
+        result = run()
+        times.append((perf_counter() - start) * 1000)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "median_ms": median(times),
+        "min_ms": min(times),
+        "runs": len(times),
+        "peak_kb": peak / 1024,
+        "result": result,
+    }
+
+
+def benchmarks(sizes: list[int], repeat: int, workdir: Path) -> dict[str, dict[str, Any]]:
+    from ..App.audio import AudioCache
+    from ..App.cache import LevelCache
+    from ..App.Conf import Conf
+    from ..App.headless import Headless
+    from ..App.parser import Parser, Level_FILE
+    from ..States.Game import Game, BodyCache, Level_MEMORY
+
+    results: dict[str, dict[str, Any]] = dict()
+
+    def record(name: str, stats: dict[str, Any], **extra: Any) -> None:
+        stats.pop("result")
+        stats.update(extra)
+        results[name] = stats
+        print(f"{name:<48} {stats['median_ms']:>10.2f} ms {stats['peak_kb']:>10.0f} KiB")
+
+    # level scan, with a throwaway cache so the real one isn't touched
+    cache_file = Conf.LEVEL_CACHE
+    Conf.LEVEL_CACHE = Path(workdir, "levels.bin")
+
+    def cold() -> None:
+        Conf.LEVEL_CACHE.unlink(missing_ok=True)
+        LevelCache.ENTRIES.clear()
+        LevelCache.LOADED = False
+
+    try:
+        stats = measure(Parser.level_load, repeat, cold)
+        levels = list(stats["result"].values())
+        record("level_load.cold", stats, levels=len(levels))
+        record("level_load.warm", measure(Parser.level_load, repeat), levels=len(levels))
+    finally:
+        Conf.LEVEL_CACHE = cache_file
+        LevelCache.ENTRIES.clear()
+        LevelCache.LOADED = False
+
+    charts = [(f"bundled.{level.path.stem}", level) for level in levels]
+    for size in sizes:
+        path = synthetic_chart(Path(workdir, f"synthetic-{size}.osu"), size)
+        charts.append((f"synthetic.{size}", Level_FILE(path, path.parent)))
+
+    record(
+        "parse_meta.bundled",
+        measure(lambda: [Level_FILE.parse_meta(level.path) for level in levels], repeat),
+        files=len(levels),
+    )
+
+    def load(level: Level_FILE) -> Callable[[], Level_MEMORY]:
+        def run() -> Level_MEMORY:
+            level.release_body()
+            return Game.load_level(level)
+
+        return run
+
+    for name, level in charts:
+        stats = measure(load(level), repeat)
+        notes = len(stats["result"].notes)
+        record(f"level_memory.{name}", stats, notes=notes)
+
+    # song decoding, once per song that's actually there
+    songs = set()
+    for name, level in charts:
+        if "AudioFilename" not in level.info:
+            continue
+        song = Game.get_audio_path(level)
+        if song in songs or not song.exists():
+            continue
+        songs.add(song)
+        record(
+            f"get_audio.{name}.miss",
+            measure(lambda: Game.get_audio(level), repeat, AudioCache.clear),
+        )
+        record(f"get_audio.{name}.hit", measure(lambda: Game.get_audio(level), repeat))
+    AudioCache.clear()
+
+    # half a second of play at 480 fps from the first note through spawn, judgement and drawing
+    for name, level in charts:
+        notes = Game.load_level(level).notes
+        events = Headless.script(notes)
+        start = notes.time[0] if len(notes) else 0
+
+        def frames() -> dict[str, Any]:
+            BodyCache.clear()
+            return Headless.run(notes, events, render=True, start=start, until=start + 500)
+
+        stats = measure(frames, repeat)
+        played = stats["result"]["frames"]
+        record(
+            f"frame.{name}",
+            stats,
+            frames=played,
+            frame_us=stats["median_ms"] * 1000 / played if played else 0.0,
+        )
+    return results
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    """
+    Returns a line for every benchmark whose median time or peak memory grew by more than threshold
+    """
+
+    regressions = list()
+    for name, stats in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        for key, label in (("median_ms", "time"), ("peak_kb", "memory")):
+            if old[key] > 0 and stats[key] > old[key] * (1 + threshold):
+                regressions.append(
+                    f"{name}: {label} {old[key]:.2f} -> {stats[key]:.2f} (+{(stats[key] / old[key] - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main() -> None:
+    from argparse import ArgumentParser
+    from json import dumps, loads
+    from platform import platform, python_version
+    from tempfile import TemporaryDirectory
+    import sys
+
+    import pygame as pg
+
+    from ..App.App import AudioWrapper
+    from ..App.Conf import Conf
+
+    args = ArgumentParser(description="Engine benchmarks")
+    args.add_argument("--sizes", default="10000,50000,200000", help="synthetic chart sizes")
+    args.add_argument("--repeat", type=int, default=3)
+    args.add_argument("--out", type=Path, default=Path(Conf.BENCH_DIR, "latest.json"))
+    args.add_argument("--save-baseline", action="store_true")
+    args.add_argument("--compare", nargs="?", type=Path, const=Path(Conf.BENCH_DIR, "baseline.json"))
+    args.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, 0.10 is 10%%")
+    options = args.parse_args()
+
+    pg.init()
+    AudioWrapper.init_audio()
+    with TemporaryDirectory() as workdir:
+        results = benchmarks(
+            [int(size) for size in options.sizes.split(",") if size],
+            options.repeat,
+            Path(workdir),
+        )
+    report = {
+        "meta": {
+            "python": python_version(),
+            "pygame": pg.version.ver,
+            "platform": platform(),
+            "repeat": options.repeat,
+        },
+        "results": results,
+    }
+
+    options.out.parent.mkdir(parents=True, exist_ok=True)
+    options.out.write_text(dumps(report, indent=2))
+    if options.save_baseline:
+        Path(Conf.BENCH_DIR, "baseline.json").write_text(dumps(report, indent=2))
+
+    status = 0
+    if options.compare is not None:
+        regressions = compare(report, loads(options.compare.read_text()), options.threshold)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            status = 1
+        else:
+            print("No regressions against", options.compare)
+    pg.quit()
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Plays charts without a window or audio and reports how they went
+
+python3 -m src.Init.headless [CHART.osu ...] [--script FILE | --auto] [--offset MS] [--fps N] [--render] [--json]
+With no charts given every installed level is played
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+
+def main() -> None:
+    from argparse import ArgumentParser
+    from json import dumps
+    from pathlib import Path
+
+    import pygame as pg
+
+    from ..App.headless import Headless
+    from ..App.parser import Parser, Level_FILE
+    from ..States.Game import Game
+
+    args = ArgumentParser(description="Headless chart runs")
+    args.add_argument("charts", nargs="*", type=Path)
+    args.add_argument("--script", type=Path, help="key events, one time,lane,pressed per line")
+    args.add_argument("--auto", action="store_true", help="autoplay instead of a script")
+    args.add_argument("--offset", type=float, default=0, help="ms late the generated script hits")
+    args.add_argument("--fps", type=float, default=480)
+    args.add_argument("--render", action="store_true", help="also draw every frame offscreen")
+    args.add_argument("--json", action="store_true")
+    options = args.parse_args()
+
+    pg.init()
+    if options.charts:
+        levels = [Level_FILE(chart, chart.parent) for chart in options.charts]
+    else:
+        levels = list(Parser.level_load().values())
+
+    results = list()
+    for level in levels:
+        notes = Game.load_level(level).notes
+        if options.script is not None:
+            events = Headless.read_script(options.script)
+        elif options.auto:
+            events = []
+        else:
+            events = Headless.script(notes, options.offset)
+        result = Headless.run(
+            notes, events, options.auto, options.fps, options.render
+        )
+        result["chart"] = str(level.path)
+        results.append(result)
+        if not options.json:
+            print(
+                f"{level.meta['TitleUnicode']} [{level.meta['Version']}]: "
+                f"{result['notes']} notes, score {result['score']}, health {result['health']}"
+                f"{' (failed)' if result['failed'] else ''}\n"
+                f"  {result['counts']}\n"
+                f"  {result['sim_seconds']:.1f}s simulated in {result['wall_seconds']:.3f}s, "
+                f"{result['speed']:.0f}x realtime over {result['frames']} frames"
+            )
+    if options.json:
+        print(dumps(results, indent=2))
+    pg.quit()
+
+
+if __name__ == "__main__":
+    main()
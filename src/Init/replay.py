@@ -0,0 +1,70 @@
+"""
+Replays recorded plays against their charts and checks the scores still come out the same
+
+python3 -m src.Init.replay [REPLAY.rpl ...]
+With no replays given every replay in Conf.REPLAY_DIR is checked, exits with 1 if any don't match
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+
+def main() -> None:
+    from argparse import ArgumentParser
+    from pathlib import Path
+    from time import perf_counter
+    import sys
+
+    import pygame as pg
+
+    from ..App.Conf import Conf
+    from ..App.parser import Level_FILE
+    from ..App.replay import Replay
+    from ..States.Game import Game
+
+    args = ArgumentParser(description="Replay verification")
+    args.add_argument("replays", nargs="*", type=Path)
+    options = args.parse_args()
+
+    pg.init()
+    paths = options.replays or sorted(Path(Conf.REPLAY_DIR).glob("*.rpl"))
+    failed = 0
+    for path in paths:
+        try:
+            replay = Replay.load(path)
+        except (OSError, ValueError) as e:
+            print(f"{path.name}: unreadable, {e}")
+            failed += 1
+            continue
+        if not replay.chart.exists():
+            print(f"{path.name}: chart {replay.chart} is gone")
+            failed += 1
+            continue
+        if Replay.chart_digest(replay.chart) != replay.digest:
+            print(f"{path.name}: chart {replay.chart.name} has changed since the play")
+            failed += 1
+            continue
+
+        notes = Game.load_level(Level_FILE(replay.chart, replay.chart.parent)).notes
+        start = perf_counter()
+        judge = replay.play(notes)
+        wall = perf_counter() - start
+        played = replay.end / replay.rate
+        ok = replay.matches(judge)
+        failed += not ok
+        print(
+            f"{path.name}: {'OK' if ok else 'MISMATCH'} score {judge.score} (recorded {replay.score}), "
+            f"{len(replay.events)} events, {played:.1f}s replayed in {wall * 1000:.1f}ms"
+            f" ({played / wall if wall else 0:.0f}x realtime)"
+        )
+        if not ok:
+            print(f"  recorded {replay.counts} health {replay.health}")
+            print(f"  replayed {judge.counts} health {judge.health}")
+    pg.quit()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
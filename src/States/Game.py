@@ -1,13 +1,22 @@
 from __future__ import annotations
-from abc import abstractmethod
-from collections.abc import Callable
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
 from pathlib import Path
-import asyncio
+from typing import Any
 
-from ..App.App import Object, App
+from ..App.App import App, TextCache
 from ..App.lib import Lib
 from ..App.Conf import Conf
+from ..App.audio import SongStream
+from ..App.clock import SongClock
+from ..App.compositor import Compositor
+from ..App.inputs import InputPump
+from ..App.judge import Judge
+from ..App.notes import NoteTable, NoteScheduler
+from ..App.simulation import Simulation
 from ..App.parser import Level_FILE
+from ..App.profiler import Profiler
+from ..App.replay import Replay
 import pygame as pg
 from pygame import (
     Rect,
@@ -18,7 +27,6 @@ from pygame import (
     display,
     image,
     Surface,
-    sprite,
     transform,
 )
 
@@ -31,28 +39,28 @@ class Game:
     """
     for some reason my type checker really doesn't like pulling fonts from app so here they are
     """
-    START_TIME: int = 0
-    PASSED_TIME: Callable[[], int]
-    PAUSE_TIME: int = 0
-
-    LOADED = sprite.Group()
-    # All note sprites are first loaded into this group
-    ACTIVE = sprite.Group()
-    # Notes that should be visible are then moved into this group
-    PASSED = sprite.Group()
-    # Notes should be moved here once hit and should then stop being updated and rendered
-    HEAD_HIT = sprite.Group()
+    SONG_CLOCK = SongClock()
+    # Song time in ms, kept in step with the audio
+
+    NOTES = NoteTable()
+    # Every note of the current level, judgement state is kept in NOTES.state
+    SCHEDULER = NoteScheduler(NOTES, 0, 0)
+    # Spawns and retires notes, SCHEDULER.active holds the ones on screen
+    JUDGE = Judge(NOTES)
+    # Judges NOTES and keeps score and health
+    SIMULATION = Simulation(JUDGE)
+    # Steps JUDGE at a fixed rate, independent of the frame rate
+    INPUTS: InputPump
+    # Timestamped lane key events waiting to be judged
+    REPLAY: Replay | None = None
+    # Records the judged key events of the current play
+    COMPOSITOR: Compositor
+    # Static layers of the last played level, its stats stay readable after the level ends
 
     MULTIPLIER = Conf.MULTIPLIER
     CONSTANT = Conf.CONSTANT
     already_paused = False
     QUIT_LEVEL = False
-    SCORE = 0
-    HEALTH = 1000
-
-    @staticmethod
-    def PASSED_TIME() -> int:
-        return time.get_ticks() - Game.START_TIME - Game.PAUSE_TIME
 
     @staticmethod
     def ingame_loop(level: Level_FILE) -> bool:
@@ -70,6 +78,24 @@ class Game:
         line = transform.scale(line, (700, 20))
         line_rect = line.get_rect(center=(950, 1000))
         cover_rect = Rect(600, 0, 700, 1080)
+        hp_region = Rect(10, 10, Judge.MAX_HEALTH // 2, 40)
+        score_region = Rect(1920 - 10 - 400, 10, 400, App.FONT32.get_linesize())
+        profile_region = Rect(10, 60, 560, App.FONT12.get_linesize() * 12)
+
+        def regions() -> list[Rect]:
+            """only the playfield column and the HUD change during play, everything else is baked once"""
+            if Profiler.ENABLED:
+                return [cover_rect, hp_region, score_region, profile_region]
+            return [cover_rect, hp_region, score_region]
+
+        COMPOSITOR = Compositor(
+            Compositor.bake(
+                Conf.SCREEN_SIZE,
+                [(bg, (0, 0)), (Surface(cover_rect.size), cover_rect), (line, line_rect)],
+            ),
+            regions(),
+        )
+        Game.COMPOSITOR = COMPOSITOR
 
         App.RECENTSCORE = 0
         Game.QUIT_LEVEL = False
@@ -81,194 +107,112 @@ class Game:
             fail = True
             AudioWrapper.fadeout(1000, AudioWrapper.song)
 
-            for n in Game.LOADED:
-                n.kill()
-            for n in Game.PASSED:
-                n.kill()
-            for n in Game.ACTIVE:
-                n.kill()
+            Game.SCHEDULER.clear()
+            BodyCache.clear()
 
             while fail:
                 App.SCREEN.fill((0, 0, 0))
                 App.SCREEN.blit(bg, (0, 0))
                 App.SCREEN.blit(line, line_rect)
-                failtext = App.FONT32.render("FAILED!", True, (255, 0, 0))
-                failprompt = App.FONT24.render(
-                    "Press enter to return to song select", True, (255, 255, 255)
+                failtext = TextCache.render(App.FONT32, "FAILED!", True, (255, 0, 0))
+                failprompt = TextCache.render(
+                    App.FONT24,
+                    "Press enter to return to song select",
+                    True,
+                    (255, 255, 255),
                 )
                 failrect = failtext.get_rect(center=(960, 540))
                 promptrect = failprompt.get_rect(center=(960, 580))
                 App.SCREEN.blits([(failtext, failrect), (failprompt, promptrect)])
                 display.flip()
-                App.CLOCK.tick_busy_loop(120)
+                App.PACER.tick(120)
                 for k in pg.event.get([pg.KEYDOWN, pg.QUIT]):
-                    if k.key == pg.K_RETURN:
-                        fail = False
-                    elif k == pg.QUIT:
+                    if k.type == pg.QUIT:
                         App.quit_app()
+                    elif k.key == pg.K_RETURN:
+                        fail = False
 
         def load_tex_UI() -> None:
-            """loads UI elememnts"""
-            App.SCREEN.blit(bg, (0, 0))
-            draw.rect(App.SCREEN, (0, 0, 0), cover_rect)
-            App.SCREEN.blit(line, line_rect)
+            """restores the static UI under everything that gets redrawn this frame"""
+            COMPOSITOR.restore(App.SCREEN)
 
         def render_ELEMENTS() -> None:
-            score_text = App.FONT32.render(f"{Game.SCORE}", True, (255, 255, 255))
-            score_rect = score_text.get_rect(topright=(1920 - 10, 10))
-            hp_rect = rect.Rect(10, 10, Game.HEALTH // 2, 40)
+            hp_rect = rect.Rect(10, 10, Game.JUDGE.health // 2, 40)
             draw.rect(App.SCREEN, (255, 255, 255), hp_rect)
-            App.SCREEN.blit(score_text, score_rect)
+            TextCache.draw_number(
+                App.SCREEN, App.FONT32, Game.JUDGE.score, (255, 255, 255), (1920 - 10, 10)
+            )
+            if Profiler.ENABLED:
+                App.SCREEN.blit(
+                    Profiler.overlay(App.FONT12, App.PACER, Game.SONG_CLOCK, COMPOSITOR),
+                    profile_region,
+                )
 
-        def mod_hp(hp: int, amount: int) -> int:
-            hp += amount
-            if hp > 1000:
-                return 1000
-            else:
-                return hp
-
-        async def update_objects() -> None:
-            # Move notes from LOADED to ACTIVE based on time
-            for sp in Game.LOADED:
-                if sp.hit_time >= Game.PASSED_TIME() - 500:
-                    sp.remove(Game.LOADED)
-                    sp.add(Game.ACTIVE)
-            Game.ACTIVE.update()
-
-        async def get_inputs() -> None:
-            for event in pg.event.get([pg.KEYDOWN, pg.KEYUP, pg.QUIT]):
+        def get_inputs() -> None:
+            INPUTS.poll()
+            control = INPUTS.control
+            while control:
+                event = control.popleft()
                 if event.type == pg.QUIT:
                     App.quit_app()
                 elif (
                     event.key == pg.K_ESCAPE and Game.already_paused == False
                 ):  # Pause handling
                     Game.already_paused = True
-                    pre_pause_time = Game.PASSED_TIME()
+                    SONG_CLOCK.pause()
                     Game.QUIT_LEVEL = pause_loop()
-                    Game.PAUSE_TIME = (
-                        Game.PASSED_TIME() - pre_pause_time + Game.PAUSE_TIME
-                    )
-                    continue
-                elif App.AUTO:
-                    continue
-                elif event.type == pg.KEYDOWN:
+                    SONG_CLOCK.resume()
+                    COMPOSITOR.invalidate()
+                    INPUTS.clear()
+                elif event.key == pg.K_F3 and event.type == pg.KEYDOWN:
+                    Profiler.toggle()
+                    COMPOSITOR.set_regions(regions())
+                elif not App.AUTO:
                     Game.already_paused = False
-                    key_name = pg.key.name(event.key)
-                    if key_name in key_events_this_frame:
-                        key_events_this_frame[key_name].append(
-                            {"event": "down", "time": Game.PASSED_TIME()}
-                        )
-                elif event.type == pg.KEYUP:
-                    Game.already_paused = False
-                    key_name = pg.key.name(event.key)
-                    if key_name in key_events_this_frame:
-                        key_events_this_frame[key_name].append(
-                            {
-                                "event": "up",
-                                "time": Game.PASSED_TIME(),
-                            }
-                        )
-                time.delay(1)
-
-        def handle_inputs() -> None:
-            for key, events in key_events_this_frame.items():
-                for event in events:
-                    if event["event"] == "down":
-                        for note in Game.ACTIVE:
-                            if note not in Game.HEAD_HIT and note.type == "LongNote":
-                                if note.required_key == key:
-                                    diff_time = abs(note.hit_time - event["time"])
-                                    if diff_time <= Conf.HIT_WINDOWS["miss"]:
-                                        if diff_time <= Conf.HIT_WINDOWS["plusperfect"]:
-                                            Game.SCORE += Conf.SCORING["plusperfect"]
-                                            Game.HEALTH = mod_hp(Game.HEALTH, 5)
-                                        elif diff_time <= Conf.HIT_WINDOWS["perfect"]:
-                                            Game.SCORE += Conf.SCORING["perfect"]
-                                            Game.HEALTH = mod_hp(Game.HEALTH, 3)
-                                        elif diff_time <= Conf.HIT_WINDOWS["great"]:
-                                            Game.SCORE += Conf.SCORING["great"]
-                                            Game.HEALTH = mod_hp(Game.HEALTH, 1)
-                                        elif diff_time <= Conf.HIT_WINDOWS["good"]:
-                                            Game.SCORE += Conf.SCORING["good"]
-                                            Game.HEALTH = mod_hp(Game.HEALTH, 0)
-                                        else:
-                                            Game.SCORE += Conf.SCORING["miss"]
-                                            Game.HEALTH = mod_hp(Game.HEALTH, -80)
-                                        note.add(
-                                            Game.HEAD_HIT
-                                        )  # Mark the long note's head as hit
-
-                            elif note.required_key == key:
-                                diff_time = abs(note.hit_time - event["time"])
-                                if diff_time <= Conf.HIT_WINDOWS["miss"]:
-                                    if diff_time <= Conf.HIT_WINDOWS["plusperfect"]:
-                                        Game.SCORE += Conf.SCORING["plusperfect"]
-                                        Game.HEALTH = mod_hp(Game.HEALTH, 5)
-                                    elif diff_time <= Conf.HIT_WINDOWS["perfect"]:
-                                        Game.SCORE += Conf.SCORING["perfect"]
-                                        Game.HEALTH = mod_hp(Game.HEALTH, 3)
-                                    elif diff_time <= Conf.HIT_WINDOWS["great"]:
-                                        Game.SCORE += Conf.SCORING["great"]
-                                        Game.HEALTH = mod_hp(Game.HEALTH, 1)
-                                    elif diff_time <= Conf.HIT_WINDOWS["good"]:
-                                        Game.SCORE += Conf.SCORING["good"]
-                                        Game.HEALTH = mod_hp(Game.HEALTH, 0)
-                                    else:
-                                        Game.SCORE += Conf.SCORING["miss"]
-                                        Game.HEALTH = mod_hp(Game.HEALTH, -80)
-
-                                    note.remove(Game.ACTIVE)
-                                    note.add(Game.PASSED)
-
-                    # On KEYUP: process the end of the long note
-                    elif event["event"] == "up":
-                        for note in Game.HEAD_HIT:
-                            if key == note.required_key and note.type == "LongNote":
-                                diff_time = abs(note.endtime - event["time"])
-                                if diff_time <= Conf.HIT_WINDOWS["miss"]:
-                                    if diff_time <= Conf.HIT_WINDOWS["plusperfect"]:
-                                        Game.SCORE += Conf.SCORING["plusperfect"]
-                                        Game.HEALTH = mod_hp(Game.HEALTH, 5)
-                                    elif diff_time <= Conf.HIT_WINDOWS["perfect"]:
-                                        Game.SCORE += Conf.SCORING["perfect"]
-                                        Game.HEALTH = mod_hp(Game.HEALTH, 3)
-                                    elif diff_time <= Conf.HIT_WINDOWS["great"]:
-                                        Game.SCORE += Conf.SCORING["great"]
-                                        Game.HEALTH = mod_hp(Game.HEALTH, 1)
-                                    elif diff_time <= Conf.HIT_WINDOWS["good"]:
-                                        Game.SCORE += Conf.SCORING["good"]
-                                        Game.HEALTH = mod_hp(Game.HEALTH, 0)
-                                else:
-                                    Game.SCORE += Conf.SCORING["miss"]
-                                    Game.HEALTH = mod_hp(Game.HEALTH, -80)
-
-                                # Remove the note from active play
-                                note.remove(Game.ACTIVE)
-                                note.remove(Game.HEAD_HIT)
-                                note.add(Game.PASSED)
-
-            for sp in Game.ACTIVE:
-                if sp.type == "TapNote" and sp.hit_time <= (
-                    Game.PASSED_TIME() - Conf.HIT_WINDOWS["miss"]
-                ):
-                    Game.SCORE += Conf.SCORING["miss"]
-                    Game.HEALTH = mod_hp(Game.HEALTH, -80)
-                    sp.remove(Game.ACTIVE)
-                    sp.add(Game.PASSED)
+
+        def take_inputs() -> list[tuple[float, int, bool]]:
+            """the queued key events for the simulation, autoplay drops them"""
+            if App.AUTO:
+                INPUTS.events.clear()
+                return []
+            if not INPUTS.events:
+                return []
+            Game.already_paused = False
+            return list(INPUTS.drain())
+
+        def poll_inputs() -> list[tuple[float, int, bool]]:
+            """picks up keys pressed while the notes were drawn, right before judging"""
+            get_inputs()
+            if Profiler.ENABLED:
+                Profiler.lap("get_inputs.post")
+            return take_inputs()
+
+        def save_replay() -> None:
+            """stores the play once the simulation has stopped for good"""
+            if Game.REPLAY is not None:
+                Game.REPLAY.finish(Game.SIMULATION)
+                Game.REPLAY.save()
+
+        def idle() -> None:
+            """keeps input and judgement going while waiting for the next frame"""
+            INPUTS.poll()
+            Game.catch_up(take_inputs())
 
         # implement a pause loop
         def pause_loop() -> bool:
             """
-            The entire feature is really half-assed so it's best to quit after pausing
-            Fixing offset is largely impossible with this setup
+            The song clock is paused around this, and pulls itself back onto the audio once it resumes
             """
             AudioWrapper.pause(AudioWrapper.song)
             pause = True
             quit = False
             while pause:
                 App.SCREEN.fill((0, 0, 0))
-                pause_text = App.FONT32.render(
-                    "PAUSED - ESC TO QUIT, ANY KEY TO CONTINUE", True, (255, 255, 255)
+                pause_text = TextCache.render(
+                    App.FONT32,
+                    "PAUSED - ESC TO QUIT, ANY KEY TO CONTINUE",
+                    True,
+                    (255, 255, 255),
                 )
                 pause_rect = pause_text.get_rect(center=(960, 540))
                 App.SCREEN.blit(pause_text, pause_rect)
@@ -282,17 +226,17 @@ class Game:
                         else:
                             pause = False
                             App.SCREEN.fill((0, 0, 0))
-                            pause_text = App.FONT32.render("3", True, (255, 255, 255))
+                            pause_text = TextCache.render(App.FONT32, "3", True, (255, 255, 255))
                             App.SCREEN.blit(pause_text, pause_rect)
                             display.flip()
                             time.delay(1000)
                             App.SCREEN.fill((0, 0, 0))
-                            pause_text = App.FONT32.render("2", True, (255, 255, 255))
+                            pause_text = TextCache.render(App.FONT32, "2", True, (255, 255, 255))
                             App.SCREEN.blit(pause_text, pause_rect)
                             display.flip()
                             time.delay(1000)
                             App.SCREEN.fill((0, 0, 0))
-                            pause_text = App.FONT32.render("1", True, (255, 255, 255))
+                            pause_text = TextCache.render(App.FONT32, "1", True, (255, 255, 255))
                             App.SCREEN.blit(pause_text, pause_rect)
                             render_ELEMENTS()
                             display.flip()
@@ -301,7 +245,7 @@ class Game:
                         App.quit_app()
 
                 display.flip()
-                App.CLOCK.tick_busy_loop(120)
+                App.PACER.tick(120)
                 if quit:
                     break
             else:
@@ -309,102 +253,164 @@ class Game:
                 return False
             return True
 
-        Game.HEALTH = 1000
-        Game.SCORE = 0
-        CLOCK = App.CLOCK
-        SONG = Game.get_audio(level)
+        PACER = App.PACER
+        SONG = Game.get_song(level)
         LEVEL_LOADED = Game.load_level(level)
 
-        for note in LEVEL_LOADED.notes:
-            Game.LOADED.add(note)
+        SONG_CLOCK = SongClock(
+            AudioWrapper.song.position
+            if isinstance(AudioWrapper.song, SongStream)
+            else None
+        )
+        Game.begin(
+            LEVEL_LOADED.notes,
+            App.AUTO,
+            SONG_CLOCK,
+            replay=Replay(level.path, App.AUTO) if Conf.RECORD_REPLAYS else None,
+        )
+        INPUTS = InputPump(SONG_CLOCK.now)
+        Game.INPUTS = INPUTS
 
+        COMPOSITOR.reset()
         load_tex_UI()
         render_ELEMENTS()
-        display.flip()
+        COMPOSITOR.present()
         time.delay(2000)
 
-        Game.START_TIME = App.DELTA_TIME()  # Call right before loop for accuracy
-
         AudioWrapper.play(SONG, AudioWrapper.song)
+        SONG_CLOCK.start()  # Call right after play, syncing takes care of the rest
         INGAME = True
 
-        # Dictionary to store key event lists for each key
-        key_events_this_frame: dict[str, list[dict]] = {
-            "s": [],
-            "d": [],
-            "f": [],
-            "space": [],
-            "j": [],
-            "k": [],
-            "l": [],
-        }
-
-        # Dictionary to track currently held keys for long notes
-        Game.PAUSE_TIME = 0
         Game.already_paused = False
+        PACER.reset()
+        Profiler.reset()
+        Profiler.start()
 
         while INGAME:
-            key_events_this_frame: dict[str, list[dict]] = {
-                "s": [],
-                "d": [],
-                "f": [],
-                "space": [],
-                "j": [],
-                "k": [],
-                "l": [],
-            }
-
+            profile = Profiler.ENABLED  # Phases are only timed while profiling
+            get_inputs()
+            if profile:
+                Profiler.lap("get_inputs.pre")
             load_tex_UI()
+            if profile:
+                Profiler.lap("load_tex_UI")
             render_ELEMENTS()
+            if profile:
+                Profiler.lap("render_ELEMENTS")
+            playing = Game.frame(App.SCREEN, poll_inputs, AudioWrapper.song)
+            # Auto-play is handled by the simulation
 
-            asyncio.run(update_objects())
-            asyncio.run(get_inputs())
-
-            if App.AUTO == False:
-                handle_inputs()
-
-            else:  # Auto-play logic
-                for note in Game.ACTIVE:
-                    if note.type == "TapNote":
-                        if note.hit_time <= Game.PASSED_TIME() - 10:
-                            Game.SCORE += Conf.SCORING["plusperfect"]
-                            note.remove(Game.ACTIVE)
-                            note.add(Game.PASSED)
-                    elif (
-                        note.hit_time <= Game.PASSED_TIME() - 10
-                        and note not in Game.HEAD_HIT
-                    ):
-                        Game.SCORE += Conf.SCORING["plusperfect"]
-                        note.add(Game.HEAD_HIT)
-                    elif note.endtime <= Game.PASSED_TIME() - 10:
-                        Game.SCORE += Conf.SCORING["plusperfect"]
-                        note.remove(Game.HEAD_HIT)
-                        note.remove(Game.ACTIVE)
-                        note.add(Game.PASSED)
-
-            if Game.HEALTH <= 0:
+            if Game.JUDGE.health <= 0:
+                save_replay()
                 failscreen()
                 break
             elif Game.QUIT_LEVEL:
                 break
-            elif AudioWrapper.song.get_busy() == False:
+            elif not playing:
                 INGAME = False
-                Game.PASSED.empty()
-                App.RECENTSCORE = Game.SCORE
 
-            if pg.event.get(pg.QUIT):
-                App.quit_app()
-
-            display.flip()
-            CLOCK.tick_busy_loop(480)
+            COMPOSITOR.present()
+            if profile:
+                Profiler.lap("present")
+            PACER.tick(480, idle)
+            if profile:
+                Profiler.lap("pace")
 
         else:
+            # the last pace still judged, so the score is only final now
+            App.RECENTSCORE = Game.JUDGE.score
+            save_replay()
             return False
         return True
 
+    @staticmethod
+    def begin(
+        notes: NoteTable,
+        auto: bool,
+        clock: SongClock,
+        start: float = 0,
+        replay: Replay | None = None,
+    ) -> None:
+        """
+        Sets up judgement and note scheduling for a play of notes timed by clock
+        Starting part way in leaves the notes before start unjudged
+        Judged key events are recorded into replay if one is given
+        """
+
+        notes.reset()
+        Game.NOTES = notes
+        Game.JUDGE = Judge(notes)
+        if start:
+            Game.JUDGE.skip(start)
+        Game.SIMULATION = Simulation(Game.JUDGE, auto, start=start)
+        Game.SCHEDULER = NoteScheduler(
+            notes,
+            *NoteScheduler.scroll_window(
+                Game.CONSTANT,
+                Game.MULTIPLIER,
+                Conf.SCREEN_SIZE[1],
+                Note.HEIGHT,
+                Conf.SPAWN_MARGIN,
+            ),
+        )
+        BodyCache.clear()
+        Game.SONG_CLOCK = clock
+        Game.REPLAY = replay
+
+    @staticmethod
+    def frame(
+        surface: Surface | None,
+        poll: Callable[[], Sequence[tuple[float, int, bool]]],
+        audio: Any,
+    ) -> bool:
+        """
+        One frame of play at the song clock's time, ingame_loop and headless runs both step through this
+        Notes are spawned, retired and drawn to surface (skipped if None), then the key events poll
+        returns are judged and the simulation is caught up with the clock
+        Returns whether the song is still playing
+        """
+
+        profile = Profiler.ENABLED
+        now = Game.SONG_CLOCK.now()
+        Game.SCHEDULER.update(now)
+        if surface is not None:
+            NoteRenderer.draw(surface, Game.NOTES, Game.SCHEDULER.active, now)
+        if profile:
+            Profiler.lap("update_objects")
+        Game.catch_up(poll())
+        if profile:
+            Profiler.lap("handle_inputs")
+        return audio.get_busy()
+
+    @staticmethod
+    def catch_up(events: Sequence[tuple[float, int, bool]]) -> None:
+        """Hands key events to the simulation and runs it up to the song clock"""
+        if events:
+            queued = Game.SIMULATION.feed(events)
+            if Game.REPLAY is not None:
+                Game.REPLAY.events.extend(queued)
+        Game.SIMULATION.advance(Game.SONG_CLOCK.now())
+
     @staticmethod
     def load_level(level: Level_FILE) -> Level_MEMORY:
-        return Level_MEMORY(level)
+        """
+        The level file only keeps its header between plays, the body is read here and dropped once loaded
+        """
+
+        level.load_body()
+        loaded = Level_MEMORY(level)
+        level.release_body()
+        return loaded
+
+    @staticmethod
+    def get_song(level: Level_FILE) -> Path | mixer.Sound:
+        """
+        Whatever AudioWrapper.song plays, a path to stream from or the fully decoded song
+        """
+
+        if Conf.STREAM_SONGS:
+            return Game.get_audio_path(level)
+        return Game.get_audio(level)
 
     @staticmethod
     def get_audio(level: Level_FILE) -> mixer.Sound:
@@ -412,18 +418,21 @@ class Game:
         For fetching the level audio for a level
         """
 
+        from ..App.App import AudioWrapper
+
+        return AudioWrapper.load(Game.get_audio_path(level))
+
+    @staticmethod
+    def get_audio_path(level: Level_FILE) -> Path:
         info = level.info
         if "AudioFilename" in info.keys():
-            SONG = mixer.Sound(
-                Path(
-                    Lib.PROJECT_ROOT,
-                    "Assets",
-                    "Levels",
-                    level.parent_path,
-                    level.info["AudioFilename"],
-                )
+            return Path(
+                Lib.PROJECT_ROOT,
+                "Assets",
+                "Levels",
+                level.parent_path,
+                level.info["AudioFilename"],
             )
-            return SONG
         else:
             App.quit_app(
                 FileNotFoundError(
@@ -433,206 +442,147 @@ class Game:
             )
 
 
-class Note(Object):
+class Note:
     """
-    Strictly only a parent class to contain TapNote and LongNote as well as common logic
-
-    TODO: Optimise runtime overhead of loading stuff
+    Note textures and screen maths
+    The notes themselves live in a NoteTable, this only knows where and how to draw one
     """
 
-    @property
-    @abstractmethod
-    def type(self) -> str:
-        pass
-
-    @property
-    @abstractmethod
-    def hit_time(self) -> int:
-        pass
-
-    @property
-    @abstractmethod
-    def lane(self) -> int:
-        pass
-
-    @property
-    def required_key(self):
-        table = {
-            0: "s",
-            1: "d",
-            2: "f",
-            3: "space",
-            4: "j",
-            5: "k",
-            6: "l",
-        }
-        return table[self.lane]
-
-    lane_map = {
-        36: 0,
-        109: 1,
-        182: 2,
-        256: 3,
-        329: 4,
-        402: 5,
-        475: 6,
-    }
-
-    _white_tex = transform.scale(image.load(Conf.NOTE_TEX_WHITE), (100, 50))
-    _blue_tex = transform.scale(image.load(Conf.NOTE_TEX_BLUE), (100, 50))
-    _gold_tex = transform.scale(image.load(Conf.NOTE_TEX_GOLD), (100, 50))
+    WIDTH = 100
+    HEIGHT = 50
+
+    _white_tex = transform.scale(image.load(Conf.NOTE_TEX_WHITE), (WIDTH, HEIGHT))
+    _blue_tex = transform.scale(image.load(Conf.NOTE_TEX_BLUE), (WIDTH, HEIGHT))
+    _gold_tex = transform.scale(image.load(Conf.NOTE_TEX_GOLD), (WIDTH, HEIGHT))
     _ln_body = image.load(Conf.NOTE_TEX_BODY)
 
-    @property
-    def image(self) -> Surface:
-        if self.lane == 3:
+    @staticmethod
+    def image(lane: int) -> Surface:
+        if lane == 3:
             return Note._gold_tex
-        return Note._white_tex if self.lane in [0, 2, 4, 6] else Note._blue_tex
-
-    def calc_pos(self) -> int:
-        out = (Game.PASSED_TIME() - self.hit_time) * Game.MULTIPLIER + Game.CONSTANT
-        return int(out)
+        return Note._white_tex if lane in [0, 2, 4, 6] else Note._blue_tex
 
+    @staticmethod
+    def x(lane: int) -> int:
+        return lane * Note.WIDTH + 600
 
-class TapNote(Note):
-    """
-    tapnote logic
     """
+    Hold tail textures MAY be implemented for certain skins and textures
+    But will not be implemented with this version as most players prefer to have them invisible
 
-    __slots__ = ("_lane", "_time")
-
-    def __init__(self, lane: int, note_time: int) -> None:
-        sprite.Sprite.__init__(self)
-        self._lane = Note.lane_map[lane]
-        self._time = note_time
-
-    def update(self) -> None:
-        App.SCREEN.blit(self.image, self.position)
-
-    @property
-    def type(self):
-        return "TapNote"
-
-    @property
-    def position(self) -> tuple[int, int]:
-        return (self.lane * 100 + 600, self.calc_pos())
-
-    @property
-    def hit_time(self) -> int:
-        return self._time
-
-    @property
-    def lane(self) -> int:
-        return self._lane
+    These are commented out but are perfectly valid implementations otherwise
+    """
+    # @staticmethod
+    # def image_tail() -> Surface:
+    #     tex = image.load(Conf.NOTE_TEX_TAIL)
+    #     tex = transform.scale(tex, (200, 100))
+    #     return tex
 
 
-class LongNote(Note):
+class BodyCache:
     """
-    LN logic
+    Shared long note body strips
+
+    Bodies are clipped to the screen and drawn as the top part of a strip at least as tall,
+    so strips only exist for a handful of height buckets instead of one surface per hold note
+    The body texture repeats vertically, so cropping a strip looks the same as stretching it
     """
 
-    __slots__ = ("_lane", "_time", "_body", "_endtime")
+    STRIPS: OrderedDict[int, Surface] = OrderedDict()
+    # bucket height -> scaled strip, least recently used first
 
-    def __init__(self, lane: int, note_time: int, note_endtime: int) -> None:
-        sprite.Sprite.__init__(self)
-        self._lane = Note.lane_map[lane]
-        self._time = note_time
-        self._endtime = note_endtime
-        self._body = transform.scale(
-            Note._ln_body, (100, self.calc_end_len() * Game.MULTIPLIER - 50)
-        )
+    @staticmethod
+    def bucket(height: int) -> int:
+        """Next power of two from 64 up, capped at the screen height"""
+        return min(max(64, 1 << (height - 1).bit_length()), Conf.SCREEN_SIZE[1])
 
-    def update(self) -> None:
-        if self not in Game.HEAD_HIT:
-            App.SCREEN.blit(
-                self._body,
-                (
-                    self.lane * 100 + 600,
-                    self.calc_pos() - self.calc_end_len() * Game.MULTIPLIER + 50,
-                ),
-            )
-            App.SCREEN.blit(self.image, self.position)
+    @staticmethod
+    def get(height: int) -> Surface:
+        """Returns a strip at least height px tall (up to the screen height)"""
+        key = BodyCache.bucket(height)
+        strip = BodyCache.STRIPS.get(key)
+        if strip is None:
+            strip = transform.scale(Note._ln_body, (Note.WIDTH, key))
+            BodyCache.STRIPS[key] = strip
+            if len(BodyCache.STRIPS) > Conf.BODY_CACHE_SIZE:
+                BodyCache.STRIPS.popitem(last=False)
         else:
-            App.SCREEN.blit(
-                self._body,
-                (
-                    self.lane * 100 + 600,
-                    self.calc_pos() - self.calc_end_len() * Game.MULTIPLIER,
-                ),
-            )
-
-    def calc_end_len(self) -> int:
-        return int(self._endtime - self._time)
-
-    @property
-    def type(self):
-        return "LongNote"
+            BodyCache.STRIPS.move_to_end(key)
+        return strip
 
-    @property
-    def position(self) -> tuple[int, int]:
-        return (self.lane * 100 + 600, self.calc_pos())
-
-    @property
-    def hit_time(self) -> int:
-        return self._time
-
-    @property
-    def endtime(self) -> int:
-        return self._endtime
+    @staticmethod
+    def clear() -> None:
+        BodyCache.STRIPS.clear()
 
-    @property
-    def lane(self) -> int:
-        return self._lane
 
+class NoteRenderer:
     """
-    Hold tail textures MAY be implemented for certain skins and textures
-    But will not be implemented with this version as most players prefer to have them invisible
+    Draws every note on screen in one pass
 
-    These are commented out but are perfectly valid implementations otherwise
+    The caller samples the clock once per frame, every y position is worked out in a single loop
+    and the whole frame goes to the screen as one blits call for bodies and one for heads
     """
-    # @property
-    # def image_tail(self) -> Surface:
-    #     tex = image.load(Conf.NOTE_TEX_TAIL)
-    #     tex = transform.scale(tex, (200, 100))
-    #     return tex
 
-    # @property
-    # def rect_tail(self) -> Rect:
-    #     return self.image_tail.get_rect()
+    @staticmethod
+    def draw(surface: Surface, notes: NoteTable, active: list[int], now: float) -> None:
+        multiplier = Game.MULTIPLIER
+        offset = Game.CONSTANT + now * multiplier
+        # y = (now - time) * multiplier + constant = offset - time * multiplier
+        bottom = surface.get_height()
+        lanes = notes.lane
+        times = notes.time
+        textures = [Note.image(lane) for lane in range(NoteTable.LANES)]
+        xs = [Note.x(lane) for lane in range(NoteTable.LANES)]
+
+        heads: list[tuple[Surface, tuple[int, int]]] = list()
+        bodies: list[tuple[Surface, tuple[int, int], Rect]] = list()
+        for i in active:
+            lane = lanes[i]
+            y = int(offset - times[i] * multiplier)
+            if notes.kind[i] == NoteTable.TAP:
+                heads.append((textures[lane], (xs[lane], y)))
+                continue
+
+            # the body spans [top, end) and is clipped to the screen before drawing
+            top = int(offset - notes.endtime[i] * multiplier)
+            if notes.state[i] & NoteTable.HEAD_HIT:
+                end = y - Note.HEIGHT
+            else:
+                top += Note.HEIGHT
+                end = y
+                heads.append((textures[lane], (xs[lane], y)))
+            top = max(top, 0)
+            end = min(end, bottom)
+            if end > top:
+                height = end - top
+                bodies.append(
+                    (
+                        BodyCache.get(height),
+                        (xs[lane], top),
+                        Rect(0, 0, Note.WIDTH, height),
+                    )
+                )
+
+        surface.blits(bodies, doreturn=False)
+        surface.blits(heads, doreturn=False)
 
 
 class Level_MEMORY:
     """
     The actual object passed to the level engine at runtime
-    Ensures reasonable overheads and isolates level data from loaded sprites which are more expensive
+    Ensures reasonable overheads and isolates level data from the note table used by the engine
     """
 
     __slots__ = ("notes", "meta", "info")
 
-    @staticmethod
-    def load_notes(line: list[str]) -> Note:
-        obj_type = int(line[3])
-        time = int(line[2])
-        endtime = time
-        lane = int(line[0])
-
-        is_tap = obj_type & (1 << 0) != 0
-        is_long = obj_type & (1 << 7) != 0
-
-        if is_tap:
-            return TapNote(lane, time)
-        elif is_long:
-            endtime = int(line[5].split(":")[0])
-            return LongNote(lane, time, endtime)
-
-        else:
-            App.quit_app(FileNotFoundError("Loaded level file is of incorrect format."))
-
     def __init__(self, level: Level_FILE) -> None:
         """
         reads level data and removes invalid notes
         """
 
-        self.notes: list[Note] = [Level_MEMORY.load_notes(line) for line in level.notes]
+        try:
+            self.notes = NoteTable.from_hitobjects(level.notes)
+        except ValueError:
+            App.quit_app(FileNotFoundError("Loaded level file is of incorrect format."))
         self.meta = level.meta
         self.info = level.info
@@ -1,16 +1,19 @@
 from __future__ import annotations
-from ..App.App import App, Object
+from ..App.App import App, Object, TextCache
 import pygame as pg
 from pygame import (
     Rect,
     display,
     image,
     sprite,
+    time,
     transform,
 )
 
 from ..App.Conf import Conf
+from ..App.audio import PreviewLoader
 from ..App.lib import Lib
+from ..App.thumbs import ThumbnailCache
 from .Game import Level_FILE
 
 
@@ -34,7 +37,7 @@ class LevelSelect:
         PREVIEW = False
 
         SELECT = True
-        CLOCK = App.CLOCK
+        PACER = App.PACER
 
         SONG_LIST: list[LevelObj] = list()
         for level in App.LEVELS.values():
@@ -48,46 +51,62 @@ class LevelSelect:
             Draws the background and individual songs according to App.LEVELS.keys()[0] and creates a dropdown/alternative menu for App.LEVELS.keys()[1]
             """
             App.SCREEN.blit(BG, (0, 0))
+            App.SCREEN.blit(SONG_LIST[index].image, (1520, 200))
+            prompt = TextCache.render(
+                App.FONT32,
+                "Select with the arrow keys, press enter to start. Toggle autoplay with tab",
+                True,
+                (255, 255, 255),
+            )
+            auto = TextCache.render(
+                App.FONT24,
+                "AUTOPLAY: " + ("ON" if App.AUTO else "OFF"),
+                True,
+                (255, 155, 155),
+            )
+            quitprompt = TextCache.render(
+                App.FONT24,
+                "Press esc to quit, press space to toggle song.",
+                True,
+                (255, 255, 255),
+            )
+            blits = [
+                (quitprompt, (700, 150)),
+                (prompt, (300, 100)),
+                (auto, (350, 150)),
+            ]
             row = 0
             for song in SONG_LIST:
                 if song.selected:
-                    text = App.FONT24.render(
+                    text = TextCache.render(
+                        App.FONT24,
                         f"> {song.level.meta["TitleUnicode"]} | {song.level.meta["Version"]}",
                         True,
                         (255, 255, 115),
                     )
                 else:
-                    text = App.FONT24.render(
+                    text = TextCache.render(
+                        App.FONT24,
                         f"  {song.level.meta["TitleUnicode"]} | {song.level.meta["Version"]}",
                         True,
                         (115, 215, 215),
                     )
-                prompt = App.FONT32.render(
-                    "Select with the arrow keys, press enter to start. Toggle autoplay with tab",
-                    True,
-                    (255, 255, 255),
-                )
-                auto = App.FONT24.render(
-                    "AUTOPLAY: " + ("ON" if App.AUTO else "OFF"),
-                    True,
-                    (255, 155, 155),
-                )
-                quitprompt = App.FONT24.render(
-                    "Press esc to quit, press space to toggle song.",
-                    True,
-                    (255, 255, 255),
-                )
-                App.SCREEN.blits(
-                    [
-                        (quitprompt, (700, 150)),
-                        (text, (400, row * 40 + 200)),
-                        (prompt, (300, 100)),
-                        (auto, (350, 150)),
-                    ]
-                )
+                blits.append((text, (400, row * 40 + 200)))
                 row += 1
+            App.SCREEN.blits(blits, doreturn=False)
+
+        PREVIEW_CHANNEL = AudioWrapper.song if Conf.STREAM_SONGS else AudioWrapper.gameFX
+        PREVIEW_CHANNEL.set_volume(0.1)
+        PREVIEWS = PreviewLoader(PREVIEW_CHANNEL)
+
+        def request_preview() -> None:
+            level = SONG_LIST[index].level
+            PREVIEWS.request(
+                Game.get_audio_path(level),
+                int(level.info.get("PreviewTime", 0)),
+                time.get_ticks(),
+            )
 
-        AudioWrapper.gameFX.set_volume(0.1)
         while SELECT:
             draw_ui()
             for event in pg.event.get():
@@ -100,6 +119,8 @@ class LevelSelect:
                         for i, song in enumerate(SONG_LIST):
                             if i != index:
                                 song.selected = False
+                        if PREVIEW:
+                            request_preview()
                     elif event.key == pg.K_DOWN:
                         index += 1
                         if index >= len(SONG_LIST):
@@ -108,6 +129,8 @@ class LevelSelect:
                         for i, song in enumerate(SONG_LIST):
                             if i != index:
                                 song.selected = False
+                        if PREVIEW:
+                            request_preview()
                     elif event.key == pg.K_ESCAPE:
                         QUIT = True
                     elif event.key == pg.K_TAB:
@@ -117,22 +140,22 @@ class LevelSelect:
                     elif event.key == pg.K_SPACE:
                         PREVIEW = not PREVIEW
                         if PREVIEW:
-                            if AudioWrapper.gameFX.get_busy():
-                                pass
-                            else:
-                                AudioWrapper.gameFX.play(Game.get_audio(SONG_LIST[index].level))
+                            request_preview()
                         else:
-                            AudioWrapper.gameFX.fadeout(500)
+                            PREVIEWS.cancel()
 
+            PREVIEWS.update(time.get_ticks())
             if QUIT:
                 break
 
             display.flip()
-            CLOCK.tick_busy_loop(120)
+            PACER.tick(120)
 
         else:
+            PREVIEWS.shutdown()
             App.CURRENT_LEVEL = SONG_LIST[index].level
             return False
+        PREVIEWS.shutdown()
         return True
 
 
@@ -157,8 +180,13 @@ class LevelObj(Object):
 
     @property
     def image(self):
-        img = transform.scale(image.load(Lib.GET_SONG_IMG(self.level)), (300, 300))
-        return img
+        """
+        Served by ThumbnailCache, a placeholder is shown while the thumbnail loads
+        """
+
+        if "Background" not in self.level.info:
+            return ThumbnailCache.placeholder()
+        return ThumbnailCache.get(Lib.GET_SONG_IMG(self.level))
 
     @property
     def rect(self) -> Rect:
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from ..App.parser import Parser
+from ..App.parser import Parser, LevelWatcher
 from ..App.App import App
 from ..App.Conf import Conf
 import pygame as pg
@@ -18,11 +18,14 @@ class Menu:
 
     @staticmethod
     def menu_loop() -> bool:
-        App.LEVELS = Parser.level_load()
         """
         Return true to quit
         """
 
+        Parser.level_refresh(
+            App.LEVELS, LevelWatcher.drain() if LevelWatcher.running() else None
+        )
+
         bg = image.load(Conf.MENU_BG)
         bg = transform.scale(bg, (1920, 1080))
         welcome_text = App.FONT72.render("Welcome to my game!", True, (255, 255, 255))
@@ -38,7 +41,7 @@ class Menu:
             App.SCREEN.blit(welcome_line2, rect_line2)
 
         MENU = True
-        CLOCK = App.CLOCK
+        PACER = App.PACER
         QUIT = False
 
         while MENU:
@@ -53,7 +56,7 @@ class Menu:
                 break
 
             display.flip()
-            CLOCK.tick_busy_loop(120)
+            PACER.tick(120)
         else:
             return False
         return True
@@ -36,7 +36,7 @@ class Results:
 
         RETRY = False
         RESULTS = True
-        CLOCK = App.CLOCK
+        PACER = App.PACER
 
         while RESULTS:
             update_ui()
@@ -51,7 +51,7 @@ class Results:
                 break
 
             display.flip()
-            CLOCK.tick_busy_loop(120)
+            PACER.tick(120)
         else:
             return False
         return True
@@ -0,0 +1,110 @@
+"""
+BatchJudge has to give exactly what Simulation + Judge give for the same notes, events and end step
+
+python3 -m unittest discover tests
+"""
+
+from random import Random
+import unittest
+
+from src.App.batch import BatchJudge
+from src.App.judge import Judge
+from src.App.notes import NoteTable
+from src.App.simulation import Simulation
+
+
+class TracingJudge(Judge):
+    __slots__ = ("trace",)
+
+    def award(self, judgement: str) -> None:
+        Judge.award(self, judgement)
+        self.trace.append((judgement, self.health))
+
+
+def random_chart(rng: Random, count: int) -> NoteTable:
+    """Dense chart with taps, long notes and zero or sub-step length long notes sharing lanes"""
+    notes = NoteTable()
+    rows = list()
+    time = 500
+    for _ in range(count):
+        time += rng.choice((0, 1, 5, 30, 80, 150, 400))
+        roll = rng.random()
+        if roll < 0.5:
+            rows.append((time, rng.randrange(NoteTable.LANES), NoteTable.TAP, time))
+        elif roll < 0.7:
+            length = rng.choice((0, 0.4, 1))
+            rows.append((time, rng.randrange(NoteTable.LANES), NoteTable.LONG, int(time + length)))
+        else:
+            length = rng.randrange(20, 1500)
+            rows.append((time, rng.randrange(NoteTable.LANES), NoteTable.LONG, time + length))
+    for time, lane, kind, endtime in sorted(rows):
+        notes.lane.append(lane)
+        notes.time.append(time)
+        notes.endtime.append(endtime)
+        notes.kind.append(kind)
+    notes.reset()
+    return notes
+
+
+def random_events(rng: Random, notes: NoteTable, end: float) -> list[tuple[float, int, bool]]:
+    """Key events near every note, jittered and with some dropped, stray and out of order"""
+    events = list()
+    jitter = rng.choice((0, 40, 150))
+    drop = rng.choice((0, 0.1, 0.4))
+    for i in range(len(notes)):
+        if rng.random() < drop:
+            continue
+        press = notes.time[i] + rng.uniform(-jitter, jitter)
+        release = max(notes.endtime[i], notes.time[i] + 20) + rng.uniform(-jitter, jitter)
+        events.append((round(press * 1000) / 1000, notes.lane[i], True))
+        events.append((round(max(press, release) * 1000) / 1000, notes.lane[i], False))
+    for _ in range(len(events) // 10):
+        events.append((round(rng.uniform(0, end) * 1000) / 1000, rng.randrange(NoteTable.LANES), rng.random() < 0.5))
+    events.sort()
+    for _ in range(len(events) // 50):
+        a = rng.randrange(len(events) - 1)
+        events[a], events[a + 1] = events[a + 1], events[a]
+    return events
+
+
+class BatchJudgeTest(unittest.TestCase):
+    RUNS = 150
+
+    def compare(self, seed: int, auto: bool) -> None:
+        rng = Random(seed)
+        notes = random_chart(rng, rng.randrange(1, 300))
+        length = max(notes.endtime) + 1000
+        events = [] if auto else random_events(rng, notes, length)
+        rate = rng.choice((1000, 1000, 240, 60))
+        step = 1000 / rate
+        end = int(length / step * rng.choice((1, 1, 0.5)))
+
+        judge = TracingJudge(notes)
+        judge.trace = list()
+        simulation = Simulation(judge, auto, rate)
+        simulation.feed(events)
+        simulation.advance(end * step)
+
+        result = BatchJudge.judge(notes, events, auto, end, rate)
+        self.assertEqual(
+            [(award[2], health) for award, health in zip(result.awards, result.health_curve)],
+            judge.trace,
+            f"seed {seed}",
+        )
+        self.assertEqual(
+            (result.score, result.health, result.counts),
+            (judge.score, judge.health, judge.counts),
+            f"seed {seed}",
+        )
+
+    def test_autoplay(self) -> None:
+        for seed in range(BatchJudgeTest.RUNS):
+            self.compare(seed, True)
+
+    def test_events(self) -> None:
+        for seed in range(BatchJudgeTest.RUNS):
+            self.compare(seed, False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+"""
+FramePacer has to work on stock pygame as well as pygame-ce
+
+python3 -m unittest discover tests
+"""
+
+import unittest
+from unittest import mock
+
+from src.App import pacer
+from src.App.pacer import FramePacer
+
+
+class FramePacerTest(unittest.TestCase):
+    def test_vsync_without_refresh_rate(self) -> None:
+        # stock pygame has no display.get_current_refresh_rate
+        display = mock.Mock(spec=["get_init"])
+        display.get_init.return_value = True
+        with mock.patch.object(pacer, "display", display):
+            self.assertEqual(FramePacer("vsync").period(120), 1 / 120)
+
+    def test_vsync_unknown_refresh_rate(self) -> None:
+        display = mock.Mock(spec=["get_init", "get_current_refresh_rate"])
+        display.get_init.return_value = True
+        display.get_current_refresh_rate.return_value = 0
+        with mock.patch.object(pacer, "display", display):
+            self.assertEqual(FramePacer("vsync").period(120), 1 / 120)
+
+    def test_vsync_uses_refresh_rate(self) -> None:
+        display = mock.Mock(spec=["get_init", "get_current_refresh_rate"])
+        display.get_init.return_value = True
+        display.get_current_refresh_rate.return_value = 60
+        with mock.patch.object(pacer, "display", display):
+            self.assertEqual(FramePacer("vsync").period(120), 1 / 60)
+
+    def test_capped_and_uncapped(self) -> None:
+        self.assertEqual(FramePacer("capped").period(240), 1 / 240)
+        self.assertEqual(FramePacer("uncapped").period(240), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+A replay of a play has to judge to exactly what the play did, even when the song clock jumped back
+
+python3 -m unittest discover tests
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import unittest
+
+from src.App.clock import SongClock
+from src.App.Conf import Conf
+from src.App.judge import Judge
+from src.App.notes import NoteTable
+from src.App.replay import Replay
+from src.App.simulation import Simulation
+
+
+def tap_chart(count: int, gap: int) -> NoteTable:
+    notes = NoteTable()
+    for i in range(count):
+        time = 500 + i * gap
+        notes.lane.append(i % NoteTable.LANES)
+        notes.time.append(time)
+        notes.endtime.append(time)
+        notes.kind.append(NoteTable.TAP)
+    notes.reset()
+    return notes
+
+
+class ReplayResyncTest(unittest.TestCase):
+    def test_backwards_resync(self) -> None:
+        notes = tap_chart(200, 15)
+        wall = [0]
+        # the audio is seeked back past Conf.CLOCK_RESYNC part way in, the keys are left alone
+        # from the stretch before until the clock follows it, so the notes played again were missed
+        jump = Conf.CLOCK_RESYNC * 2
+        clock = SongClock(
+            lambda: wall[0] / 1_000_000 - (jump if wall[0] > 1_500_000_000 else 0),
+            lambda: wall[0],
+        )
+        clock.start()
+        judge = Judge(notes)
+        simulation = Simulation(judge)
+        recorded = list()
+        resynced = False
+        pressed = -1
+
+        while wall[0] < 4_500_000_000:
+            wall[0] += 7_300_000
+            now = clock.now()
+            resynced = resynced or now < simulation.time
+            # press each note once, when it's the closest one to now
+            closest = round((now - 500) / 15)
+            if (
+                closest != pressed
+                and 0 <= closest < len(notes)
+                and (resynced or wall[0] <= 1_500_000_000 - jump * 1_000_000)
+            ):
+                pressed = closest
+                lane = closest % NoteTable.LANES
+                stamp = round(now * 1000) / 1000
+                recorded.extend(simulation.feed([(stamp, lane, True), (stamp, lane, False)]))
+            simulation.advance(clock.now())
+        self.assertTrue(resynced)
+
+        with TemporaryDirectory() as folder:
+            chart = Path(folder, "chart.osu")
+            chart.write_bytes(b"chart")
+            replay = Replay(chart)
+            replay.events = recorded
+            replay.finish(simulation)
+            replay = Replay.decode(replay.encode())
+        result = replay.play(notes)
+        self.assertEqual(
+            (result.score, result.health, result.counts),
+            (judge.score, judge.health, judge.counts),
+        )
+        self.assertTrue(replay.matches(result))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+ThumbnailCache has to get past a bad thumbnail in STO instead of leaving the placeholder up
+
+python3 -m unittest discover tests
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import unittest
+from unittest import mock
+
+from pygame import image, Surface
+
+from src.App.Conf import Conf
+from src.App.thumbs import ThumbnailCache
+
+
+class ThumbnailCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        folder = TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = Path(folder.name)
+        patch = mock.patch.object(Conf, "THUMB_DIR", Path(self.folder, "thumbs"))
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.source = Path(self.folder, "bg.png")
+        background = Surface((64, 48))
+        background.fill((200, 40, 40))
+        image.save(background, str(self.source))
+
+    def tearDown(self) -> None:
+        ThumbnailCache.READY.clear()
+
+    def load(self) -> Surface | None:
+        ThumbnailCache.load(self.source)
+        return ThumbnailCache.READY.pop(self.source)
+
+    def test_truncated_thumbnail(self) -> None:
+        self.assertIsNotNone(self.load())
+        (stored,) = Conf.THUMB_DIR.iterdir()
+        stored.write_bytes(stored.read_bytes()[:100])
+
+        thumb = self.load()
+        self.assertIsNotNone(thumb)
+        self.assertEqual(thumb.get_at((0, 0))[:3], (200, 40, 40))
+        width, height = ThumbnailCache.SIZE
+        self.assertEqual(len(stored.read_bytes()), width * height * 3)
+
+    def test_unwritable_store(self) -> None:
+        # a file where the folder should be makes every write fail
+        Conf.THUMB_DIR.write_bytes(b"")
+        self.assertIsNotNone(self.load())
+
+
+if __name__ == "__main__":
+    unittest.main()